@@ -0,0 +1,228 @@
+import io
+import os
+import hashlib
+import threading
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Worker processes rendering charts; jobs beyond MAX_PENDING_RENDERS wait for a free slot
+RENDER_WORKERS = int(os.getenv("CHART_RENDER_WORKERS", "2"))
+MAX_PENDING_RENDERS = int(os.getenv("CHART_MAX_PENDING", str(RENDER_WORKERS * 4)))
+
+
+# Rendering resolution
+CHART_DPI = 100
+
+# Bump whenever rendering changes how a chart looks, so stored charts are not reused
+CHART_STYLE_VERSION = 2
+
+
+def _figure(figsize):
+    """A standalone Figure with its own Agg canvas (no pyplot global state)."""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=CHART_DPI)
+    return buffer.getvalue()
+
+
+def render_time_series(x, series, title, figsize=(12, 6)):
+    """
+    Line chart of several series against a shared x axis (dates). Every point is
+    plotted: Agg already simplifies dense paths, and downsampling did not make
+    multi-year PNGs faster or smaller.
+    """
+    fig = _figure(figsize)
+    ax = fig.add_subplot()
+    for name, values in series.items():
+        ax.plot(x, values, label=name)
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Value")
+    ax.set_title(title)
+    ax.legend()
+    ax.grid(True)
+    return _png(fig)
+
+
+def render_correlation(correlation, title, figsize=(10, 8)):
+    """Annotated heatmap of a correlation matrix (DataFrame)."""
+    import seaborn as sns
+    fig = _figure(figsize)
+    ax = fig.add_subplot()
+    sns.heatmap(correlation, annot=True, cmap="coolwarm", center=0, ax=ax)
+    ax.set_title(title)
+    return _png(fig)
+
+
+def render_line_chart(x, series, title):
+    """Smaller line chart used for metric groups of similar scale."""
+    return render_time_series(x, series, title, figsize=(10, 6))
+
+
+RENDERERS = {
+    "time_series": render_time_series,
+    "line_chart": render_line_chart,
+    "correlation": render_correlation,
+}
+
+
+def render_chart(chart_type, **kwargs):
+    """Renders a chart to PNG bytes in the calling process."""
+    return RENDERERS[chart_type](**kwargs)
+
+
+def _update_hash(digest, value):
+    """Feeds a chart argument (arrays, frames, dicts, scalars) into digest."""
+    if hasattr(value, "to_numpy") and hasattr(value, "columns"):
+        _update_hash(digest, [list(map(str, value.index)), list(map(str, value.columns)), value.to_numpy()])
+    elif isinstance(value, np.ndarray):
+        digest.update(f"{value.dtype.str}{value.shape}".encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        digest.update(b"{")
+        for key, item in value.items():
+            _update_hash(digest, key)
+            _update_hash(digest, item)
+        digest.update(b"}")
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"[")
+        for item in value:
+            _update_hash(digest, item)
+        digest.update(b"]")
+    else:
+        digest.update(repr(value).encode() + b";")
+
+
+def chart_content_key(chart_type, kwargs):
+    """
+    Hash of everything that determines a chart's pixels: chart type, style version,
+    and the data, columns and title passed to the renderer.
+    """
+    digest = hashlib.sha256(f"{chart_type}|{CHART_STYLE_VERSION}|".encode())
+    _update_hash(digest, {name: kwargs[name] for name in sorted(kwargs)})
+    return digest.hexdigest()
+
+
+def _render_and_upload(chart_type, kwargs, s3_key):
+    """Worker-process job: render a chart and upload it to its S3 key."""
+    from s3_utils import put_visualization
+    put_visualization(render_chart(chart_type, **kwargs), s3_key)
+    return s3_key
+
+
+class ChartRenderPool:
+    """
+    Bounded process pool that renders and uploads charts off the request thread.
+
+    Workers are spawned (not forked) so they never inherit the server's threads or
+    locks. At most max_pending jobs are queued or running; submit blocks beyond that.
+    """
+
+    def __init__(self, workers=RENDER_WORKERS, max_pending=MAX_PENDING_RENDERS):
+        self.workers = workers
+        self._executor = self._new_executor()
+        self._executor_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def submit(self, chart_type, s3_key, **kwargs):
+        self._slots.acquire()
+        try:
+            executor = self._executor
+            try:
+                future = executor.submit(_render_and_upload, chart_type, kwargs, s3_key)
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory); start a fresh pool
+                future = self._replace_broken(executor).submit(_render_and_upload, chart_type, kwargs, s3_key)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._on_done(f, s3_key))
+        return future
+
+    def _replace_broken(self, broken):
+        """Replaces the broken executor once, even if several threads saw it break."""
+        with self._executor_lock:
+            if self._executor is broken:
+                broken.shutdown(wait=False)
+                self._executor = self._new_executor()
+            return self._executor
+
+    def _on_done(self, future, s3_key):
+        self._slots.release()
+        if future.cancelled():
+            print(f"Rendering visualization {s3_key} was cancelled")
+        elif future.exception() is not None:
+            print(f"Error rendering visualization {s3_key}: {future.exception()}")
+
+    def shutdown(self, wait=True):
+        with self._executor_lock:
+            self._executor.shutdown(wait=wait)
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_render_pool():
+    """Returns the process-wide chart render pool."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ChartRenderPool()
+        return _POOL
+
+
+def shutdown_render_pool():
+    """Waits for pending renders and stops the workers (e.g. on shutdown)."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown()
+            _POOL = None
+
+
+def submit_chart(chart_type, **kwargs):
+    """
+    Returns the presigned URL of a chart, rendering and uploading it in the background
+    unless an identical chart is already stored. Charts are content-addressed: the S3
+    key is the chart's content hash, and the object exists once the job finishes.
+    """
+    from s3_utils import presign_visualization_url
+    from agents.chart_store import get_chart_index, chart_s3_key
+    index = get_chart_index()
+    content_key = chart_content_key(chart_type, kwargs)
+    url = index.get(content_key)
+    if url is not None:
+        print(f"Reusing stored {chart_type} chart {content_key[:12]}")
+        return url
+    s3_key = chart_s3_key(content_key)
+    url = presign_visualization_url(s3_key)
+    # Indexed right away so repeats arriving while it renders are not rendered twice
+    index.put(content_key, s3_key, url)
+    try:
+        future = get_render_pool().submit(chart_type, s3_key, **kwargs)
+    except Exception:
+        # Never queued (e.g. pool shut down): the URL would point at a missing object
+        index.discard(content_key)
+        raise
+
+    def forget_failed(done):
+        if done.cancelled() or done.exception() is not None:
+            index.discard(content_key)
+
+    future.add_done_callback(forget_failed)
+    return url
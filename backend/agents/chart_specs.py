@@ -0,0 +1,142 @@
+import os
+import numpy as np
+
+# How charts are returned: rendered PNGs on S3, or Vega-Lite specs rendered by the client
+CHART_FORMATS = ("png", "vega_lite")
+
+VEGA_LITE_SCHEMA = "https://vega.github.io/schema/vega-lite/v5.json"
+
+# Significant digits kept for values embedded in a spec
+SPEC_PRECISION = 6
+
+# Points kept per series in a spec; about one per two pixel columns of the plot area
+SPEC_SERIES_POINTS = int(os.getenv("CHART_SPEC_SERIES_POINTS", "500"))
+
+
+def _number(value):
+    """A JSON-safe rounded float (None for NaN/inf)."""
+    value = float(value)
+    if not np.isfinite(value):
+        return None
+    return float(f"{value:.{SPEC_PRECISION}g}")
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling: indices of `threshold` points that
+    preserve the visual shape of (x, y). Keeps the first and last point; from each
+    bucket picks the point forming the largest triangle with the previously kept
+    point and the average of the next bucket.
+
+    y may be 2-D (points x series): every series is downsampled in the same pass
+    and the result has one column of indices per series.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    squeeze = y.ndim == 1
+    if squeeze:
+        y = y[:, None]
+    n, k = y.shape
+    if threshold >= n or threshold < 3:
+        indices = np.repeat(np.arange(n)[:, None], k, axis=1)
+        return indices[:, 0] if squeeze else indices
+    x = np.asarray(x, dtype=np.float64)
+    # Bucket boundaries for the n - 2 interior points; bucket averages in one pass
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    next_edges = np.append(edges[1:], n)
+    avg_x = np.add.reduceat(x, edges) / (next_edges - edges)
+    avg_y = np.add.reduceat(y, edges, axis=0) / (next_edges - edges)[:, None]
+    indices = np.empty((threshold, k), dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    previous = np.zeros(k, dtype=np.int64)
+    columns = np.arange(k)
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Average of the next bucket (the last bucket's successor is the final point)
+        next_bucket = bucket + 1
+        ax, ay = avg_x[next_bucket], avg_y[next_bucket]
+        px, py = x[previous], y[previous, columns]
+        areas = np.abs(
+            (px - ax) * (y[start:end] - py)
+            - (px - x[start:end, None]) * (ay - py)
+        )
+        previous = start + np.argmax(areas, axis=0)
+        indices[bucket + 1] = previous
+    return indices[:, 0] if squeeze else indices
+
+
+def downsample_series(x, series, threshold):
+    """
+    Downsamples every series to at most `threshold` points with LTTB.
+    Each series keeps its own shape-preserving points; returns {name: (x, y)}.
+    """
+    x = np.asarray(x)
+    x_numeric = x.astype("datetime64[ns]").astype(np.int64) if np.issubdtype(x.dtype, np.datetime64) else x
+    names = list(series)
+    values = np.column_stack([np.asarray(series[name], dtype=np.float64) for name in names])
+    if not np.isnan(values).any():
+        keep = lttb_indices(x_numeric, values, threshold)
+        return {name: (x[keep[:, i]], values[keep[:, i], i]) for i, name in enumerate(names)}
+    # Series with gaps are downsampled one by one over their valid points
+    result = {}
+    for i, name in enumerate(names):
+        valid = np.flatnonzero(~np.isnan(values[:, i]))
+        keep = valid[lttb_indices(x_numeric[valid], values[valid, i], threshold)]
+        result[name] = (x[keep], values[keep, i])
+    return result
+
+
+def time_series_spec(x, series, title):
+    """
+    Vega-Lite line chart of several series against dates, in long format
+    (one Date/Metric/Value record per point). Series are downsampled with LTTB
+    to SPEC_SERIES_POINTS, so the payload stays small for long date ranges.
+    """
+    values = []
+    for name, (xs, ys) in downsample_series(np.asarray(x, dtype="datetime64[ns]"), series, SPEC_SERIES_POINTS).items():
+        dates = np.datetime_as_string(xs, unit="D")
+        values.extend({"Date": date, "Metric": name, "Value": _number(y)} for date, y in zip(dates, ys))
+    return {
+        "$schema": VEGA_LITE_SCHEMA,
+        "title": title,
+        "data": {"values": values},
+        "mark": {"type": "line", "tooltip": True},
+        "encoding": {
+            "x": {"field": "Date", "type": "temporal"},
+            "y": {"field": "Value", "type": "quantitative", "scale": {"zero": False}},
+            "color": {"field": "Metric", "type": "nominal"},
+        },
+    }
+
+
+def correlation_spec(correlation, title):
+    """Vega-Lite annotated heatmap of a correlation matrix (DataFrame)."""
+    values = [
+        {"Row": str(row), "Column": str(column), "Correlation": _number(correlation.loc[row, column])}
+        for row in correlation.index
+        for column in correlation.columns
+    ]
+    encoding = {
+        "x": {"field": "Column", "type": "nominal", "sort": None},
+        "y": {"field": "Row", "type": "nominal", "sort": None},
+    }
+    return {
+        "$schema": VEGA_LITE_SCHEMA,
+        "title": title,
+        "data": {"values": values},
+        "encoding": encoding,
+        "layer": [
+            {
+                "mark": "rect",
+                "encoding": {
+                    "color": {
+                        "field": "Correlation", "type": "quantitative",
+                        "scale": {"scheme": "redblue", "domain": [-1, 1], "reverse": True},
+                    },
+                },
+            },
+            {
+                "mark": "text",
+                "encoding": {"text": {"field": "Correlation", "type": "quantitative", "format": ".2f"}},
+            },
+        ],
+    }
@@ -0,0 +1,98 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CHART_INDEX_PATH = os.getenv("CHART_INDEX_PATH", "data/chart_index.json")
+CHART_INDEX_SIZE = int(os.getenv("CHART_INDEX_SIZE", "1024"))
+
+# Content-addressed charts live under the temp prefix, which S3 expires after a day
+CHART_PREFIX = "visualizations/temp/charts"
+
+# Seconds an indexed chart is reused; below the 1-day object lifecycle and 24-hour URL expiry
+CHART_REUSE_SECONDS = int(os.getenv("CHART_REUSE_SECONDS", str(20 * 3600)))
+
+
+def chart_s3_key(content_key):
+    return f"{CHART_PREFIX}/{content_key}.png"
+
+
+class ChartIndex:
+    """
+    LRU index of charts already rendered to S3, keyed by content hash.
+
+    Each entry records the chart's S3 key and presigned URL. Entries are reused for
+    CHART_REUSE_SECONDS, after which the object (under the expiring temp prefix)
+    and its URL may be gone, so the chart is rendered again. The index is
+    persisted to disk so restarts keep their hits.
+    """
+
+    def __init__(self, path=CHART_INDEX_PATH, max_entries=CHART_INDEX_SIZE, reuse_seconds=CHART_REUSE_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.reuse_seconds = reuse_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # content key -> entry, least recently used first
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self._entries = OrderedDict((entry["key"], entry) for entry in data.get("entries", []))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Ignoring unreadable chart index: {e}")
+
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"entries": list(self._entries.values())}, f)
+        os.replace(tmp_path, self.path)
+
+    def get(self, content_key):
+        """Returns the presigned URL of a stored chart, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(content_key)
+            if entry is None:
+                return None
+            if time.time() - entry["created"] > self.reuse_seconds:
+                del self._entries[content_key]
+                self._save()
+                return None
+            self._entries.move_to_end(content_key)
+            return entry["url"]
+
+    def put(self, content_key, s3_key, url):
+        with self._lock:
+            self._entries[content_key] = {"key": content_key, "s3_key": s3_key, "url": url, "created": time.time()}
+            self._entries.move_to_end(content_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def discard(self, content_key):
+        """Forgets a chart, e.g. when its render or upload failed."""
+        with self._lock:
+            if self._entries.pop(content_key, None) is not None:
+                self._save()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_INDEX = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_chart_index():
+    """Returns the process-wide chart index."""
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            _INDEX = ChartIndex()
+        return _INDEX
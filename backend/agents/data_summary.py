@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+# Significant digits kept for numbers in the summary prompt
+PROMPT_PRECISION = 6
+
+# Rows of the aggregated result included in the prompt
+MAX_AGGREGATED_ROWS = 40
+
+SAMPLE_ROWS = 5
+
+_PERIOD_COLUMNS = {"YEAR", "QUARTER"}
+
+
+def summary_statistics(df):
+    """
+    Min, max, mean and median of every numeric metric column, computed over the
+    numeric block as one 2-D array (one vectorized reduction per statistic).
+
+    Returns:
+        pd.DataFrame: one row per column, with min/max/mean/median columns.
+    """
+    if df is None or df.empty:
+        return pd.DataFrame(columns=["min", "max", "mean", "median"])
+    columns = [col for col in df.select_dtypes(include="number").columns if str(col).upper() not in _PERIOD_COLUMNS]
+    if not columns:
+        return pd.DataFrame(columns=["min", "max", "mean", "median"])
+    values = df[columns].to_numpy(dtype=np.float64)
+    with np.errstate(all="ignore"):
+        stats = np.vstack([
+            np.nanmin(values, axis=0),
+            np.nanmax(values, axis=0),
+            np.nanmean(values, axis=0),
+            np.nanmedian(values, axis=0),
+        ]).T
+    return pd.DataFrame(stats, index=columns, columns=["min", "max", "mean", "median"])
+
+
+def format_table(df, max_rows=None, index=False):
+    """Serializes a frame as compact CSV text with rounded numbers and plain dates."""
+    if df is None or df.empty:
+        return "(no rows)"
+    table = df
+    note = ""
+    if max_rows is not None and len(df) > max_rows:
+        table = df.head(max_rows)
+        note = f"\n({len(df) - max_rows} more rows omitted)"
+    text = table.to_csv(index=index, float_format=f"%.{PROMPT_PRECISION}g", date_format="%Y-%m-%d")
+    return text.strip() + note
+
+
+def build_summary_prompt(query, agg_df, raw_df):
+    """The Gemini prompt for generate_data_summary, with data as compact tables."""
+    stats = summary_statistics(raw_df)
+    return f"""
+    As a financial analyst, summarize the following NVIDIA data in response to this query:
+
+    QUERY: {query}
+
+    AGGREGATED DATA:
+{format_table(agg_df, max_rows=MAX_AGGREGATED_ROWS)}
+
+    SAMPLE RAW DATA ({SAMPLE_ROWS} of {0 if raw_df is None else len(raw_df)} rows):
+{format_table(None if raw_df is None else raw_df.head(SAMPLE_ROWS))}
+
+    STATISTICS (over all raw rows):
+{format_table(stats, index=True)}
+
+    Provide a clear, concise summary focusing on key insights related to the query.
+    Include notable trends, patterns, or outliers in the data.
+    Use specific numbers from the data to support your analysis.
+    """
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+# Annualization factor for daily volatility
+TRADING_DAYS = 252
+
+MA_WINDOWS = {"MA10": 10, "MA30": 30}
+VOLATILITY_WINDOW = 20
+RSI_WINDOW = 14
+
+
+def _group_starts(tickers):
+    """For each row, the position of the first row of its ticker (rows sorted by ticker)."""
+    n = len(tickers)
+    is_start = np.ones(n, dtype=bool)
+    is_start[1:] = tickers[1:] != tickers[:-1]
+    return np.maximum.accumulate(np.where(is_start, np.arange(n), 0))
+
+
+def _rolling_window_bounds(starts, window):
+    """First row and row count of each trailing window, clipped at the ticker's first row."""
+    positions = np.arange(len(starts))
+    lower = np.maximum(positions - window + 1, starts)
+    return lower, positions - lower + 1
+
+
+def _window_sum(cumsum, lower, out):
+    """Sum over [lower, i] for every row i, from a cumulative sum with a leading zero."""
+    np.subtract(cumsum[1:], cumsum[lower], out=out)
+    return out
+
+
+def _rolling_mean(values, starts, window):
+    """Per-ticker rolling mean with min_periods=1, like Series.rolling(window, min_periods=1).mean()."""
+    cumsum = np.concatenate(([0.0], np.cumsum(values)))
+    lower, count = _rolling_window_bounds(starts, window)
+    out = np.empty(len(values))
+    _window_sum(cumsum, lower, out)
+    out /= count
+    return out
+
+
+def _rolling_std(values, starts, window):
+    """Per-ticker rolling sample standard deviation with min_periods=1 (NaN for a single row)."""
+    lower, count = _rolling_window_bounds(starts, window)
+    sums = np.empty(len(values))
+    squares = np.empty(len(values))
+    _window_sum(np.concatenate(([0.0], np.cumsum(values))), lower, sums)
+    _window_sum(np.concatenate(([0.0], np.cumsum(values * values))), lower, squares)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variance = (squares - sums * sums / count) / (count - 1)
+    return np.sqrt(np.clip(variance, 0.0, None), where=count > 1, out=np.full(len(values), np.nan))
+
+
+def compute_indicators(df):
+    """
+    Computes the technical indicators for many tickers in one long frame.
+
+    df needs Ticker, Date, Open, High, Low, Close and Volume columns. Rows are sorted
+    by ticker and date, and every indicator is computed in vectorized passes over
+    the whole frame with windows clipped at ticker boundaries, into preallocated
+    arrays. Values match the per-ticker pandas rolling computation.
+
+    Returns:
+        pd.DataFrame: the sorted frame with DailyChange, DailyChangePercent,
+        DollarVolume, MA10, MA30, Volatility20D and RSI columns added.
+    """
+    df = df.sort_values(["Ticker", "Date"], kind="stable").reset_index(drop=True)
+    tickers = df["Ticker"].to_numpy()
+    starts = _group_starts(tickers)
+    first_rows = starts == np.arange(len(df))
+
+    close = df["Close"].to_numpy(dtype=np.float64)
+    open_ = df["Open"].to_numpy(dtype=np.float64)
+    volume = df["Volume"].to_numpy(dtype=np.float64)
+
+    indicators = {
+        "DailyChange": close - open_,
+        "DailyChangePercent": (close / open_ - 1) * 100,
+        "DollarVolume": volume * close,
+    }
+    for name, window in MA_WINDOWS.items():
+        indicators[name] = _rolling_mean(close, starts, window)
+
+    # Day-over-day change within each ticker; 0 on a ticker's first row
+    delta = np.zeros(len(df))
+    delta[1:] = close[1:] - close[:-1]
+    delta[first_rows] = 0.0
+
+    returns = np.zeros(len(df))
+    np.divide(delta[1:], close[:-1], out=returns[1:], where=~first_rows[1:])
+    returns[first_rows] = 0.0
+    indicators["Volatility20D"] = _rolling_std(returns, starts, VOLATILITY_WINDOW) * (TRADING_DAYS ** 0.5)
+
+    up_mean = _rolling_mean(np.clip(delta, 0, None), starts, RSI_WINDOW)
+    down_mean = _rolling_mean(np.clip(-delta, 0, None), starts, RSI_WINDOW)
+    # Avoid division by zero
+    down_mean[down_mean == 0] = np.finfo(float).eps
+    indicators["RSI"] = 100 - (100 / (1 + up_mean / down_mean))
+
+    for name, values in indicators.items():
+        df[name] = values
+    return df
+
+
+def write_partitioned_parquet(df, root):
+    """Writes the frame as Parquet partitioned by Ticker and Year under root."""
+    df = df.copy()
+    if "Year" not in df.columns:
+        df["Year"] = pd.to_datetime(df["Date"]).dt.year
+    df.to_parquet(root, partition_cols=["Ticker", "Year"], index=False, existing_data_behavior="delete_matching")
+    return root
@@ -0,0 +1,152 @@
+import os
+import re
+import time
+import threading
+import duckdb
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+REPLICA_DIR = os.getenv("REPLICA_DIR", "data/replica")
+REPLICA_S3_PREFIX = "replica"
+
+# Tables the replica holds; everything else is sent to Snowflake
+REPLICA_TABLES = ("NVIDIA_FIN_DATA", "NVIDIA_FIN_QUARTERLY")
+
+# How often (seconds) the backend checks S3 for a newer replica
+REPLICA_CHECK_INTERVAL = int(os.getenv("REPLICA_CHECK_INTERVAL", "300"))
+
+_TABLE_REFERENCE = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_][\w.\"]*)", re.IGNORECASE)
+
+
+class ReplicaMiss(Exception):
+    """Raised when a query cannot be answered from the local replica."""
+
+
+def replica_path(table):
+    return os.path.join(REPLICA_DIR, f"{table}.parquet")
+
+
+def referenced_tables(sql):
+    """Returns the unqualified, upper-cased table names a query reads from."""
+    return {match.split(".")[-1].strip('"').upper() for match in _TABLE_REFERENCE.findall(sql)}
+
+
+def write_replica(df, table="NVIDIA_FIN_DATA", upload=True):
+    """
+    Writes a table replica as Parquet with Snowflake's upper-case column names,
+    and uploads it to S3 so backend workers can pull it.
+    """
+    replica = df.copy()
+    replica.columns = [column.upper() for column in replica.columns]
+    if "DATE" in replica.columns:
+        dates = pd.to_datetime(replica["DATE"])
+        # NVIDIA_FIN_DATA stores TIMESTAMP_NTZ values: keep the exchange wall-clock time
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_localize(None)
+        replica["DATE"] = dates
+
+    os.makedirs(REPLICA_DIR, exist_ok=True)
+    path = replica_path(table)
+    tmp_path = f"{path}.tmp"
+    replica.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    print(f"Local replica of {table} written to {path} ({len(replica)} rows)")
+
+    if upload:
+        from s3_utils import upload_to_s3
+        with open(path, "rb") as f:
+            upload_to_s3(f"{REPLICA_S3_PREFIX}/{table}.parquet", f.read())
+    return path
+
+
+class LocalReplica:
+    """
+    Embedded DuckDB engine over the Parquet replicas.
+    Tables are loaded into memory and reloaded when their file changes.
+    """
+
+    def __init__(self):
+        self._conn = duckdb.connect()
+        # Mirror Snowflake's database/schema so qualified table names resolve too
+        self._conn.execute("ATTACH ':memory:' AS NVIDIA_DB")
+        self._conn.execute("CREATE SCHEMA IF NOT EXISTS NVIDIA_DB.NVIDIA_SCHEMA")
+        self._conn.execute("USE NVIDIA_DB.NVIDIA_SCHEMA")
+        self._lock = threading.Lock()
+        self._loaded = {}        # table -> file mtime
+        self._last_check = {}    # table -> time of last S3 freshness check
+
+    def _sync_from_s3(self, table):
+        """Downloads the replica from S3 when missing locally or older than the S3 copy."""
+        now = time.monotonic()
+        path = replica_path(table)
+        if os.path.exists(path) and now - self._last_check.get(table, 0) < REPLICA_CHECK_INTERVAL:
+            return
+        self._last_check[table] = now
+        try:
+            from s3_utils import get_s3_client
+            s3_client = get_s3_client()
+            bucket_name = os.getenv('AWS_S3_BUCKET_NAME')
+            key = f"{REPLICA_S3_PREFIX}/{table}.parquet"
+            head = s3_client.head_object(Bucket=bucket_name, Key=key)
+            if os.path.exists(path) and os.path.getmtime(path) >= head["LastModified"].timestamp():
+                return
+            os.makedirs(REPLICA_DIR, exist_ok=True)
+            s3_client.download_file(bucket_name, key, f"{path}.tmp")
+            os.replace(f"{path}.tmp", path)
+            print(f"Downloaded replica of {table} from S3")
+        except Exception as e:
+            print(f"Could not sync replica of {table} from S3: {e}")
+
+    def _ensure_loaded(self, table):
+        self._sync_from_s3(table)
+        path = replica_path(table)
+        if not os.path.exists(path):
+            raise ReplicaMiss(f"No local replica for {table}")
+        mtime = os.path.getmtime(path)
+        if self._loaded.get(table) != mtime:
+            self._conn.execute(f"CREATE OR REPLACE TABLE NVIDIA_DB.NVIDIA_SCHEMA.{table} AS SELECT * FROM read_parquet(?)", [path])
+            self._loaded[table] = mtime
+
+    def query(self, sql, timeout=None):
+        """
+        Runs a query against the replica, raising ReplicaMiss if it needs other tables.
+        A query still running after timeout seconds is interrupted.
+        """
+        tables = referenced_tables(sql)
+        missing = tables - set(REPLICA_TABLES)
+        if not tables or missing:
+            raise ReplicaMiss(f"Tables not in replica: {sorted(missing) or 'none referenced'}")
+        with self._lock:
+            for table in tables:
+                self._ensure_loaded(table)
+            cursor = self._conn.cursor()
+        timer = threading.Timer(timeout, cursor.interrupt) if timeout else None
+        try:
+            cursor.execute("USE NVIDIA_DB.NVIDIA_SCHEMA")
+            if timer:
+                timer.start()
+            return cursor.execute(sql).fetchdf()
+        except duckdb.InterruptException:
+            # A query too slow for the embedded engine would not be faster on Snowflake
+            raise TimeoutError(f"Replica query exceeded {timeout}s")
+        except duckdb.Error as e:
+            raise ReplicaMiss(f"Replica could not run query: {e}")
+        finally:
+            if timer:
+                timer.cancel()
+            cursor.close()
+
+
+_REPLICA = None
+_REPLICA_LOCK = threading.Lock()
+
+
+def get_local_replica():
+    """Returns the process-wide local replica."""
+    global _REPLICA
+    with _REPLICA_LOCK:
+        if _REPLICA is None:
+            _REPLICA = LocalReplica()
+        return _REPLICA
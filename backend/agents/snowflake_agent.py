@@ -1,27 +1,35 @@
-import snowflake.connector
 from dotenv import load_dotenv
 import google.generativeai as genai
 import os
 import re
+import json
 import pandas as pd
-import matplotlib.pyplot as plt
-import uuid
-import io
-from datetime import datetime
-from s3_utils import upload_visualization_to_s3
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from agents.chart_renderer import submit_chart
+from agents.chart_specs import time_series_spec, correlation_spec
+from agents.snowflake_pool import get_snowflake_pool
+from agents.local_replica import get_local_replica, ReplicaMiss
+from agents.sql_guardrails import (
+    prepare_query, check_explain, truncate_result, QueryRejected, STATEMENT_TIMEOUT_SECONDS
+)
+from agents.data_summary import build_summary_prompt
+from agents.sql_plan_cache import get_sql_plan_cache, bind_periods, schema_fingerprint, PERIOD_PLACEHOLDER
 import numpy as np
-import seaborn as sns
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-def fetch_snowflake_response(query, year_quarter_dict):
-
-    GOOGLE_API_KEY = os.getenv("GEMINI_API_KEY")
 
-    prompt = f"""
+# Columns of NVIDIA_FIN_DATA that can be charted
+CHARTABLE_COLUMNS = [
+    "OPEN", "HIGH", "LOW", "CLOSE", "VOLUME", "DAILYCHANGE", "DAILYCHANGEPERCENT",
+    "DOLLARVOLUME", "MA10", "MA30", "VOLATILITY20D", "RSI"
+]
 
+# Table description given to the SQL planner; also the source of the plan cache's schema fingerprint
+NVIDIA_FIN_DATA_DESCRIPTION = """
     I have a table in Snowflake that contains financial data for NVidia. This table records information for each day with different columns that represent various financial metrics.
     
     **Input Table: NVIDIA_FIN_DATA**  
@@ -42,160 +50,326 @@ def fetch_snowflake_response(query, year_quarter_dict):
     - `VOLATILITY20D FLOAT`: The 20-day volatility of the stock's price, indicating how much the price fluctuates over the past 20 days.
     - `Year INT`: The year of the financial record.
     - `Quarter INT`: The quarter of the financial record.
+"""
+
+# Precomputed per-quarter aggregates built by snowflake_pipeline.py
+NVIDIA_FIN_QUARTERLY_DESCRIPTION = """
+    **Rollup Table: NVIDIA_FIN_QUARTERLY** (one row per `Ticker`, `Year` and `Quarter`)
+    - `TICKER TEXT`, `Year INT`, `Quarter INT`: The stock and the period.
+    - `PERIODSTART TIMESTAMP_NTZ`, `PERIODEND TIMESTAMP_NTZ`: First and last trading day in the quarter.
+    - `TRADINGDAYS NUMBER`: Number of trading days in the quarter.
+    - `QUARTEROPEN FLOAT`, `QUARTERENDCLOSE FLOAT`: Opening price on the first day and closing price on the last day.
+    - `QUARTERRETURNPERCENT FLOAT`: Percentage change from QUARTEROPEN to QUARTERENDCLOSE.
+    - `QUARTERHIGH FLOAT`, `QUARTERLOW FLOAT`, `AVGCLOSE FLOAT`: Highest high, lowest low and average close.
+    - `TOTALVOLUME NUMBER`, `AVGVOLUME FLOAT`: Total and average daily shares traded.
+    - `TOTALDOLLARVOLUME FLOAT`, `AVGDOLLARVOLUME FLOAT`: Total and average daily dollar volume.
+    - `AVGDAILYCHANGEPERCENT FLOAT`: Average daily percentage change.
+    - `AVGRSI FLOAT`, `MINRSI FLOAT`, `MAXRSI FLOAT`: Average, minimum and maximum RSI.
+    - `AVGVOLATILITY20D FLOAT`: Average 20-day volatility.
+    - `QUARTERENDMA10 FLOAT`, `QUARTERENDMA30 FLOAT`: Moving averages on the last day of the quarter.
+"""
+
+# Structure Gemini must return for a Snowflake-mode question
+QUERY_PLAN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "aggregated_query": {"type": "string"},
+        "raw_query": {"type": "string"},
+        "chart_columns": {"type": "array", "items": {"type": "string"}},
+        "explanation": {"type": "string"}
+    },
+    "required": ["aggregated_query", "raw_query", "chart_columns"]
+}
+
+
+def table_schema_fingerprint():
+    """
+    Fingerprint of the table descriptions the planner writes SQL against. Always
+    taken from the descriptions (not the replica, whose Arrow types differ), so it
+    only changes when the schema given to the planner changes.
+    """
+    columns = []
+    for table, description in (("NVIDIA_FIN_DATA", NVIDIA_FIN_DATA_DESCRIPTION),
+                               ("NVIDIA_FIN_QUARTERLY", NVIDIA_FIN_QUARTERLY_DESCRIPTION)):
+        columns += [(f"{table}.{name}", data_type) for name, data_type in re.findall(r"`(\w+) (\w+)`", description)]
+    return schema_fingerprint(columns)
+
+
+def default_query_plan():
+    """Deterministic parameterized plan used when the LLM response cannot be used."""
+    return {
+        "aggregated_query": (
+            "SELECT Year, Quarter, TOTALDOLLARVOLUME, AVGRSI, AVGCLOSE, QUARTERENDCLOSE "
+            f"FROM NVIDIA_FIN_QUARTERLY WHERE {PERIOD_PLACEHOLDER} ORDER BY Year, Quarter"
+        ),
+        "raw_query": (
+            "SELECT DATE, Year, Quarter, CLOSE, HIGH, LOW, DOLLARVOLUME FROM NVIDIA_FIN_DATA "
+            f"WHERE {PERIOD_PLACEHOLDER} ORDER BY DATE"
+        ),
+        "chart_columns": ["CLOSE", "HIGH", "LOW"],
+        "explanation": "Default plan"
+    }
+
+
+def parse_query_plan(response_text):
+    """
+    Parses and validates the JSON query plan returned by Gemini.
+    Raises ValueError if the plan is malformed.
+    """
+    plan = json.loads(response_text)
+    if not isinstance(plan, dict):
+        raise ValueError("Query plan is not a JSON object")
+    for key in ("aggregated_query", "raw_query"):
+        sql = plan.get(key)
+        if not isinstance(sql, str) or not sql.strip().upper().startswith(("SELECT", "WITH")):
+            raise ValueError(f"{key} is not a SELECT statement")
+        # A single statement without the trailing semicolon
+        sql = sql.strip().rstrip(";").strip()
+        if ";" in sql:
+            raise ValueError(f"{key} contains more than one statement")
+        if PERIOD_PLACEHOLDER not in sql:
+            raise ValueError(f"{key} does not filter periods with {PERIOD_PLACEHOLDER}")
+        plan[key] = sql
+    columns = plan.get("chart_columns") or []
+    if not isinstance(columns, list):
+        raise ValueError("chart_columns is not a list")
+    plan["chart_columns"] = [
+        col.strip().upper() for col in columns
+        if isinstance(col, str) and col.strip().upper() in CHARTABLE_COLUMNS
+    ][:4]
+    plan.setdefault("explanation", "")
+    return plan
+
+
+def fetch_snowflake_response(query, year_quarter_dict):
+    """
+    Plans a Snowflake-mode question with one structured Gemini call.
+
+    Returns a validated dict with 'aggregated_query', 'raw_query', 'chart_columns'
+    and 'explanation', with the selected periods bound into both queries. Plans are
+    generated with a period placeholder and cached, so a repeated or similar question
+    reuses the cached SQL for any periods. If the response cannot be parsed after one
+    retry, a default plan is returned instead.
+    """
+    schema = table_schema_fingerprint()
+    plan_cache = get_sql_plan_cache()
+    try:
+        cached_plan = plan_cache.get(query, year_quarter_dict, schema)
+    except Exception as e:
+        print(f"SQL plan cache unavailable: {e}")
+        cached_plan = None
+    if cached_plan is not None:
+        print("Using cached SQL plan")
+        return cached_plan
+
+    GOOGLE_API_KEY = os.getenv("GEMINI_API_KEY")
+
+    prompt = f"""
 
+{NVIDIA_FIN_DATA_DESCRIPTION}{NVIDIA_FIN_QUARTERLY_DESCRIPTION}
     **Important Notes for Gemini:**
     - Identify the relevant columns from the provided metadata based on the user's query.
     - Generate the appropriate SQL query that will fetch the relevant data to answer the user's query.
     - Make sure to consider: The specific financial metric(s) being asked (e.g., revenue, net income)
     - I have already added `Year` and `Quarter` as separate columns in the table.  
-    - The filtering should be done **directly** using these columns, **without** needing to extract them from the `DATE` column.  
-    - The user will provide a dictionary containing `Year` and `Quarter`, which should be used for filtering.  
+    - The filtering is done **directly** on these columns, **without** needing to extract them from the `DATE` column.  
+    - The periods the user selected are bound into the queries through a placeholder (see below), so the same queries can be reused for other periods.  
     - Your main task is to generate the required SQL queries based on the user's request and correctly identify the relevant column(s).
 
     **User Query:**  
     {query}
 
-    **Time Duration:**  
-    The user will specify the time frame using a dictionary containing `Year` and `Quarter`.  
-    Example: `{year_quarter_dict}`
-
     **Task for Gemini:**  
-    Based on the user's query, generate **two separate SQL queries**:
-
-    ### **1. Aggregated Query (Summing financial metrics like DOLLARVOLUME)**
-    - This query should aggregate the specified metric (e.g., `SUM(DOLLARVOLUME)`) over the relevant time periods (specific quarters or years).
-    - Use the `Year` and `Quarter` columns for filtering.
-
-    ### **2. Raw Data Query (Without Aggregation)**
-    - This query should retrieve individual record/records (financial metrics that is relevant to the user query, e.g., `(DOLLARVOLUME)`) along with date, year, quater without aggregation.
-    - It should filter based on `Year` and `Quarter`.
-
-    **Format of Response:**
-    1. **Query 1: Aggregated Query**, followed by the SQL code.
-    2. **Query 2: Raw Data Query**, followed by the SQL code.
-    
-    - Ensure proper formatting and structuring of the queries.
-    - The explanation should follow after the SQL code, not between the queries.
-
+    Based on the user's query, return a JSON object with:
+
+    - `aggregated_query`: a single SQL query returning the aggregated metric(s) relevant to the query per
+      `Year` and `Quarter`. Prefer selecting the precomputed columns of NVIDIA_FIN_QUARTERLY (e.g. `TOTALDOLLARVOLUME`,
+      `AVGRSI`, `QUARTERENDCLOSE`); only aggregate NVIDIA_FIN_DATA (e.g. `SUM(DOLLARVOLUME)`) when no rollup column fits.
+    - `raw_query`: a single SQL query that retrieves the individual daily records of the relevant metric(s)
+      along with `DATE`, `Year` and `Quarter`, without aggregation.
+    - `chart_columns`: the 1-4 column names from {CHARTABLE_COLUMNS} that best visualize the answer;
+      they must appear in `raw_query`.
+    - `explanation`: one sentence describing the queries.
+
+    Each query must be one SELECT statement on NVIDIA_FIN_QUARTERLY or NVIDIA_FIN_DATA without a trailing semicolon.
+    Do not write the Year/Quarter conditions yourself: put the literal placeholder {PERIOD_PLACEHOLDER}
+    in each WHERE clause where the period filter belongs (e.g. `WHERE {PERIOD_PLACEHOLDER}`);
+    it is replaced with the user's periods before the query runs.
 """
     genai.configure(api_key=GOOGLE_API_KEY)
     gemini_model = genai.GenerativeModel("gemini-1.5-pro")
-    response = gemini_model.generate_content(prompt)
-    # Call Gemini API (example, your logic here might differ)
-    #print(response.text)
-
-    return response.text.strip()
-
+    generation_config = {"response_mime_type": "application/json", "response_schema": QUERY_PLAN_SCHEMA}
+
+    for attempt in range(2):
+        try:
+            response = gemini_model.generate_content(prompt, generation_config=generation_config)
+            plan = parse_query_plan(response.text)
+            break
+        except Exception as e:
+            print(f"Invalid query plan from Gemini (attempt {attempt + 1}): {e}")
+            prompt += f"\n    Your previous response was invalid ({e}). Return only the JSON object.\n"
+    else:
+        return bind_periods(default_query_plan(), year_quarter_dict)
 
-def fetch_snowflake_df(query):
-    # Snowflake connection details
-    SNOWFLAKE_ACCOUNT = os.getenv("SNOWFLAKE_ACCOUNT")
-    SNOWFLAKE_USER = os.getenv("SNOWFLAKE_USER")
-    SNOWFLAKE_PASSWORD = os.getenv("SNOWFLAKE_PASSWORD")
-    SNOWFLAKE_ROLE = os.getenv("SNOWFLAKE_ROLE")
+    try:
+        plan_cache.put(query, year_quarter_dict, plan, schema)
+    except Exception as e:
+        print(f"Could not cache SQL plan: {e}")
+    return bind_periods(plan, year_quarter_dict)
 
-    # Connecting to Snowflake
-    conn = snowflake.connector.connect(
-        user=SNOWFLAKE_USER,
-        password=SNOWFLAKE_PASSWORD,
-        account=SNOWFLAKE_ACCOUNT,
-        role=SNOWFLAKE_ROLE
-    )
 
-    cur = conn.cursor()
-    cur.execute("USE DATABASE NVIDIA_DB;")
-    cur.execute("USE SCHEMA NVIDIA_DB.NVIDIA_SCHEMA;")
+# Columns stored in small integer types; YEAR needs int16 since values exceed int8's range
+PERIOD_DTYPES = {"YEAR": "int16", "QUARTER": "int8"}
+CATEGORICAL_COLUMNS = ("TICKER",)
 
-    # Improved regex pattern to handle more SQL query formats
-    columns_pattern = re.search(r"SELECT\s+([\w\s,.*()]+?)\s+FROM", query, re.IGNORECASE | re.MULTILINE)
-    
+def compact_dtypes(df):
+    """
+    Shrinks a result DataFrame in place: float32 metrics, categorical ticker and
+    small integer year/quarter. Column names are matched case-insensitively.
+    """
+    for col in df.columns:
+        name = str(col).upper()
+        series = df[col]
+        if name in PERIOD_DTYPES and pd.api.types.is_numeric_dtype(series) and not series.isna().any():
+            df[col] = series.astype(PERIOD_DTYPES[name])
+        elif name in CATEGORICAL_COLUMNS:
+            df[col] = series.astype("category")
+        elif pd.api.types.is_float_dtype(series):
+            df[col] = series.astype("float32")
+        elif series.dtype == object and len(series) and series.map(lambda v: isinstance(v, Decimal)).all():
+            # NUMBER(p,s) columns arrive as Decimal when fetched row by row
+            df[col] = series.astype("float32")
+    return df
+
+def fetch_snowflake_df(query, use_replica=True, require_filter=False):
+    """
+    Runs a generated query behind the guardrails: read-only single statement, a
+    period filter when require_filter is set, an injected row cap and a statement
+    timeout. On Snowflake, plans that scan every partition of a large table are
+    refused when a filter was required. Returns an empty DataFrame on rejection or error.
+    """
     try:
-        # Execute the query first to get actual column names
-        cur.execute(query)
-        results = cur.fetchall()
-        
-        # Get column names from cursor description (this is more reliable)
-        column_names = [col[0] for col in cur.description]
-        
-        # Create DataFrame with the correct column names
-        df = pd.DataFrame(results, columns=column_names)
-        return df
-
-    except Exception as e:
-        print(f"Error executing query: {e}")
-        return pd.DataFrame()  # Return empty DataFrame on error
-    finally:
-        cur.close()
-        conn.close()
-
-def create_and_save_graph(df, query, timestamp, metadata_filters=None):
-    """Create focused visualizations based on query relevance."""
+        guarded_query = prepare_query(query, require_filter=require_filter)
+    except QueryRejected as e:
+        print(f"Query rejected: {e}")
+        return pd.DataFrame()
+
+    # Serve queries on tables held by the local replica without a warehouse round trip
+    if use_replica:
+        try:
+            df = get_local_replica().query(guarded_query, timeout=STATEMENT_TIMEOUT_SECONDS)
+            return compact_dtypes(truncate_result(df))
+        except ReplicaMiss as e:
+            print(f"Falling back to Snowflake: {e}")
+        except TimeoutError as e:
+            print(f"Error executing query: {e}")
+            return pd.DataFrame()
+
+    from snowflake.connector import errors as snowflake_errors
+
+    # Borrow a pooled connection; database and schema are preset on pooled connections
+    with get_snowflake_pool().connection() as conn:
+        cur = conn.cursor()
+        try:
+            if require_filter:
+                check_explain(cur, guarded_query)
+            cur.execute(guarded_query, timeout=STATEMENT_TIMEOUT_SECONDS)
+            try:
+                # Columnar Arrow batches straight into pandas, compacted batch by batch
+                batches = [compact_dtypes(batch) for batch in cur.fetch_pandas_batches()]
+                if not batches:
+                    return pd.DataFrame(columns=[col[0] for col in cur.description])
+                df = pd.concat(batches, ignore_index=True) if len(batches) > 1 else batches[0]
+                # Categories can differ between batches; concat falls back to object
+                return compact_dtypes(truncate_result(df))
+            except snowflake_errors.NotSupportedError:
+                # Result set is not Arrow-backed (e.g. SHOW/DESCRIBE): fetch rows instead
+                results = cur.fetchall()
+                column_names = [col[0] for col in cur.description]
+                return compact_dtypes(truncate_result(pd.DataFrame(results, columns=column_names)))
+
+        except QueryRejected as e:
+            print(f"Query rejected: {e}")
+            return pd.DataFrame()
+        except Exception as e:
+            print(f"Error executing query: {e}")
+            return pd.DataFrame()  # Return empty DataFrame on error
+        finally:
+            cur.close()
+
+def fetch_snowflake_dfs(queries, require_filter=False):
+    """
+    Runs independent queries concurrently and returns their DataFrames in order
+    (None for a missing query). Each worker borrows its own pooled connection.
+    """
+    results = [None] * len(queries)
+    pending = [(idx, q) for idx, q in enumerate(queries) if q]
+    if len(pending) <= 1:
+        for idx, q in pending:
+            results[idx] = fetch_snowflake_df(q, require_filter=require_filter)
+        return results
+    with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+        futures = {idx: executor.submit(fetch_snowflake_df, q, require_filter=require_filter) for idx, q in pending}
+        for idx, future in futures.items():
+            results[idx] = future.result()
+    return results
+
+def create_and_save_graph(df, query, metadata_filters=None, relevant_columns=None, chart_format="png"):
+    """
+    Create focused visualizations based on query relevance.
+    relevant_columns comes from the query plan; the LLM is only asked when it is missing.
+    With chart_format="vega_lite" each visualization carries a Vega-Lite "spec" for the
+    client to render instead of a PNG "url" (nothing is rendered or uploaded).
+    """
     try:
         # Ensure 'Date' column is properly formatted
         df['Date'] = pd.to_datetime(df['DATE'])
         
         # Get relevant columns with fallback options
-        relevant_columns = get_relevant_columns(query, df.columns, metadata_filters)
-        
-        # Create visualization folder path with timestamp
-        viz_folder = f"visualizations/temp/query_{timestamp}"
+        relevant_columns = [col for col in (relevant_columns or []) if col in df.columns]
+        if not relevant_columns:
+            relevant_columns = get_relevant_columns(query, df.columns, metadata_filters)
+        if not relevant_columns:
+            relevant_columns = default_visualization_columns(df.columns)
         
         visualizations = []
         
         # 1. Create time series plot for main metrics
-        plt.figure(figsize=(12, 6))
-        for col in relevant_columns[:3]:  # Limit to top 3 most relevant metrics
-            plt.plot(df['Date'], df[col], label=col)
-        plt.xlabel('Date')
-        plt.ylabel('Value')
-        plt.title(f'NVIDIA Key Metrics: {", ".join(relevant_columns[:3])}')
-        plt.legend()
-        plt.grid(True)
-        
-        # Save and upload time series plot
-        buffer1 = io.BytesIO()
-        plt.savefig(buffer1, format='png')
-        buffer1.seek(0)
-        plt.close()
-        
-        ts_url = upload_visualization_to_s3(
-            image_data=buffer1.getvalue(),
-            prefix=f"{viz_folder}/time_series",
-            filename="time_series.png"
-        )
-        
+        time_series = {
+            "x": df['Date'].to_numpy(),
+            "series": {col: df[col].to_numpy() for col in relevant_columns[:3]},  # Limit to top 3 most relevant metrics
+            "title": f'NVIDIA Key Metrics: {", ".join(relevant_columns[:3])}'
+        }
         visualizations.append({
-            "url": ts_url,
             "type": "time_series",
             "title": "Key Metrics Time Series",
             "columns": relevant_columns[:3]
         })
         
         # 2. Create correlation heatmap if we have multiple relevant columns
+        correlation = None
         if len(relevant_columns) > 1:
-            plt.figure(figsize=(10, 8))
-            correlation = df[relevant_columns].corr()
-            sns.heatmap(correlation, annot=True, cmap='coolwarm', center=0)
-            plt.title('Correlation between Key Metrics')
-            
-            buffer2 = io.BytesIO()
-            plt.savefig(buffer2, format='png')
-            buffer2.seek(0)
-            plt.close()
-            
-            corr_url = upload_visualization_to_s3(
-                image_data=buffer2.getvalue(),
-                prefix=f"{viz_folder}/correlation",
-                filename="correlation.png"
-            )
-            
+            correlation = {
+                "correlation": df[relevant_columns].corr(),
+                "title": 'Correlation between Key Metrics'
+            }
             visualizations.append({
-                "url": corr_url,
                 "type": "correlation",
                 "title": "Metrics Correlation Analysis",
                 "columns": relevant_columns
             })
         
+        if chart_format == "vega_lite":
+            visualizations[0]["spec"] = time_series_spec(**time_series)
+            if correlation is not None:
+                visualizations[1]["spec"] = correlation_spec(**correlation)
+        else:
+            # Charts are rendered and uploaded in the background render pool (or reused
+            # if an identical chart is stored); their presigned URLs are returned immediately
+            visualizations[0]["url"] = submit_chart("time_series", **time_series)
+            if correlation is not None:
+                visualizations[1]["url"] = submit_chart("correlation", **correlation)
+        
         return visualizations
         
     except Exception as e:
@@ -227,66 +401,53 @@ def get_relevant_columns(query, available_columns, metadata_filters=None):
     # use default visualization columns based on time period
     if not relevant_cols or all(col in ['Year', 'Quarter', 'DATE'] for col in relevant_cols):
         print("No specific columns identified from query, using default visualization columns")
-        
-        # Default visualization set 1: Price and Volume trends
-        price_cols = ['HIGH', 'LOW', 'CLOSE', 'DOLLARVOLUME']
-        # Default visualization set 2: Technical indicators
-        tech_cols = ['MA10', 'MA30', 'RSI', 'VOLATILITY20D']
-        
-        # Check which columns are available and use them
-        available_price_cols = [col for col in price_cols if col in available_columns]
-        available_tech_cols = [col for col in tech_cols if col in available_columns]
-        
-        # Use price columns as primary fallback
-        if available_price_cols:
-            relevant_cols = available_price_cols[:3]  # Limit to 3 columns
-            print(f"Using default price-based columns: {relevant_cols}")
-        # Use technical indicators as secondary fallback
-        elif available_tech_cols:
-            relevant_cols = available_tech_cols[:3]
-            print(f"Using default technical indicator columns: {relevant_cols}")
+        relevant_cols = default_visualization_columns(available_columns)
     
     return relevant_cols
 
-year_quarter_dict = {
-    "2024": ["1", "2", "3"],
-    "2023": ["2", "4"]
-}
-
-query = "What is the MA10 value for a specific stock (TICKER) on a given date?"
-
-input_string = fetch_snowflake_response(query,year_quarter_dict)
-
-queries = re.findall(r"(SELECT[\s\S]*?);", input_string)
-
-# Store the queries in variables
-agg_query = queries[0] if len(queries) > 0 else None
-raw_query = queries[1] if len(queries) > 1 else None
-
-#fetch_snowflake_df(agg_query)
-dataframe = fetch_snowflake_df(raw_query)
-create_and_save_graph(dataframe, query, datetime.now().strftime('%Y%m%d%H%M%S'))
+def default_visualization_columns(available_columns):
+    """Default chart columns: price trends first, then technical indicators."""
+    relevant_cols = []
+    # Default visualization set 1: Price and Volume trends
+    price_cols = ['HIGH', 'LOW', 'CLOSE', 'DOLLARVOLUME']
+    # Default visualization set 2: Technical indicators
+    tech_cols = ['MA10', 'MA30', 'RSI', 'VOLATILITY20D']
+    
+    # Check which columns are available and use them
+    available_price_cols = [col for col in price_cols if col in available_columns]
+    available_tech_cols = [col for col in tech_cols if col in available_columns]
+    
+    # Use price columns as primary fallback
+    if available_price_cols:
+        relevant_cols = available_price_cols[:3]  # Limit to 3 columns
+        print(f"Using default price-based columns: {relevant_cols}")
+    # Use technical indicators as secondary fallback
+    elif available_tech_cols:
+        relevant_cols = available_tech_cols[:3]
+        print(f"Using default technical indicator columns: {relevant_cols}")
+    
+    return relevant_cols
 
-def generate_snowflake_insights(query, year_quarter_dict):
-    """Main function to generate insights from Snowflake data."""
+def generate_snowflake_insights(query, year_quarter_dict, chart_format="png"):
+    """
+    Main function to generate insights from Snowflake data.
+    chart_format is "png" (presigned S3 image URLs) or "vega_lite" (client-rendered specs).
+    """
     try:
-        # Get SQL queries based on user question
-        llm_response = fetch_snowflake_response(query, year_quarter_dict)
-        queries = re.findall(r"(SELECT[\s\S]*?);", llm_response)
-        
-        # Extract queries
-        agg_query = queries[0] if len(queries) > 0 else None
-        raw_query = queries[1] if len(queries) > 1 else None
+        # Get SQL queries and chart columns based on user question (one LLM call)
+        query_plan = fetch_snowflake_response(query, year_quarter_dict)
+        agg_query = query_plan["aggregated_query"]
+        raw_query = query_plan["raw_query"]
         
-        # Execute queries and get data
-        agg_df = fetch_snowflake_df(agg_query) if agg_query else None
-        raw_df = fetch_snowflake_df(raw_query) if raw_query else None
+        # Execute both independent queries concurrently, each on its own pooled connection
+        agg_df, raw_df = fetch_snowflake_dfs([agg_query, raw_query], require_filter=bool(year_quarter_dict))
         
         # Generate visualization if we have raw data
         visualizations = []
         if raw_df is not None and not raw_df.empty:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            visualizations = create_and_save_graph(raw_df, query, timestamp)
+            visualizations = create_and_save_graph(raw_df, query,
+                                                   relevant_columns=query_plan["chart_columns"],
+                                                   chart_format=chart_format)
             
             print("\n" + "="*80)
             print("🖼️ VISUALIZATION DEBUG")
@@ -297,7 +458,7 @@ def generate_snowflake_insights(query, year_quarter_dict):
                 print(f"Type: {viz['type']}")
                 print(f"Title: {viz['title']}")
                 print(f"Columns: {viz['columns']}")
-                print(f"URL: {viz['url']}")
+                print(f"URL: {viz['url']}" if "url" in viz else f"Spec: {len(viz['spec']['data']['values'])} data points")
             print("="*80 + "\n")
         
         # Generate summary of the data
@@ -338,8 +499,8 @@ def create_intelligent_visualizations(df, query):
     query_terms = set(query.lower().split())
     
     # Identify numeric columns that aren't DATE, Year, or Quarter
-    numeric_cols = df.select_dtypes(include=['float64', 'int64']).columns.tolist()
-    numeric_cols = [col for col in numeric_cols if col not in ['Year', 'Quarter']]
+    numeric_cols = df.select_dtypes(include='number').columns.tolist()
+    numeric_cols = [col for col in numeric_cols if str(col).upper() not in PERIOD_DTYPES]
     
     # Ensure 'DATE' column is datetime
     if 'DATE' in df.columns:
@@ -375,7 +536,7 @@ def create_intelligent_visualizations(df, query):
         # Create separate visualizations for each scale group
         for magnitude, cols in scale_groups.items():
             if cols:
-                viz_url = create_and_upload_visualization(df, cols, f"magnitude_{magnitude}")
+                viz_url = create_and_upload_visualization(df, cols)
                 viz_urls.append({
                     "url": viz_url,
                     "type": "line_chart",
@@ -384,7 +545,7 @@ def create_intelligent_visualizations(df, query):
                 })
     else:
         # Just one column, create a single visualization
-        viz_url = create_and_upload_visualization(df, relevant_cols, "single_metric")
+        viz_url = create_and_upload_visualization(df, relevant_cols)
         viz_urls.append({
             "url": viz_url,
             "type": "line_chart",
@@ -394,78 +555,26 @@ def create_intelligent_visualizations(df, query):
     
     return viz_urls
 
-def create_and_upload_visualization(df, columns, chart_type):
-    """Create visualization and upload to S3, returning the URL."""
-    # Create the plot
-    plt.figure(figsize=(10, 6))
-    
+def create_and_upload_visualization(df, columns):
+    """Queue a line chart for background rendering and upload, returning its URL."""
     # If we have date column, use it for x-axis
     if 'DATE' in df.columns:
-        x_column = 'DATE'
+        x_values = df['DATE'].to_numpy()
     else:
         # Use the first available index
-        x_column = df.index
-    
-    # Plot each selected column
-    for column in columns:
-        plt.plot(df[x_column], df[column], label=column)
-    
-    # Add chart elements
-    plt.xlabel('Date')
-    plt.ylabel('Value')
-    plt.title(f'NVIDIA Financial Metrics: {", ".join(columns)}')
-    plt.legend()
-    plt.grid(True)
+        x_values = df.index.to_numpy()
     
-    # Save to buffer
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png')
-    buffer.seek(0)
-    plt.close()
-    
-    # Use the specialized function to upload and get URL
-    viz_prefix = f"nvidia_{chart_type}"
-    presigned_url = upload_visualization_to_s3(
-        image_data=buffer.getvalue(),
-        prefix=viz_prefix
+    return submit_chart(
+        "line_chart",
+        x=x_values,
+        series={column: df[column].to_numpy() for column in columns},
+        title=f'NVIDIA Financial Metrics: {", ".join(columns)}'
     )
-    
-    return presigned_url
 
 def generate_data_summary(query, agg_df, raw_df):
     """Generate a text summary of the data based on query and results."""
-    # Prepare data for summarization
-    agg_data = agg_df.to_dict(orient="records") if agg_df is not None else []
-    sample_data = raw_df.head(5).to_dict(orient="records") if raw_df is not None else []
-    
-    # Describe the data's statistical properties
-    stats = {}
-    if raw_df is not None:
-        numeric_cols = raw_df.select_dtypes(include=['float64', 'int64']).columns
-        for col in numeric_cols:
-            stats[col] = {
-                "min": raw_df[col].min(),
-                "max": raw_df[col].max(),
-                "avg": raw_df[col].mean(),
-                "median": raw_df[col].median()
-            }
-    
-    # Create a prompt for the LLM to summarize the data
-    prompt = f"""
-    As a financial analyst, summarize the following NVIDIA data in response to this query:
-    
-    QUERY: {query}
-    
-    AGGREGATED DATA: {agg_data}
-    
-    SAMPLE RAW DATA: {sample_data}
-    
-    STATISTICS: {stats}
-    
-    Provide a clear, concise summary focusing on key insights related to the query.
-    Include notable trends, patterns, or outliers in the data.
-    Use specific numbers from the data to support your analysis.
-    """
+    # Statistics in one vectorized pass; data serialized as compact rounded tables
+    prompt = build_summary_prompt(query, agg_df, raw_df)
     
     # Get summary from Gemini
     genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
@@ -1,13 +1,98 @@
 import yfinance as yf
 from dotenv import load_dotenv
 from pathlib import Path
+import argparse
+import pandas as pd
 import numpy as np
 import io
 import snowflake.connector
 import os
+import s3_utils
+from agents.local_replica import write_replica, replica_path
+from agents.indicator_engine import compute_indicators, write_partitioned_parquet
 
 load_dotenv()
 
+# Column order of NVIDIA_FIN_DATA (and of the CSVs copied into it)
+TABLE_COLUMNS = [
+    'Ticker', 'Date', 'Open', 'High', 'Low', 'Close', 'Volume', 'DailyChange', 'DailyChangePercent',
+    'DollarVolume', 'MA10', 'MA30', 'Volatility20D', 'RSI', 'Year', 'Quarter'
+]
+
+# NVIDIA and the peers used for comparison questions
+PEER_TICKERS = ("NVDA", "AMD", "INTC", "AVGO")
+PEER_DATASET_DIR = "data/market_data"
+
+# Longest indicator lookback (MA30); rows kept to extend indicators incrementally
+INDICATOR_WINDOW = 30
+
+# Loaded rows persisted per ticker: the lookback plus the last loaded day, which
+# every incremental load fetches again (it may have been an unfinished session)
+TAIL_ROWS = INDICATOR_WINDOW + 1
+
+# Standard per-quarter aggregates of NVIDIA_FIN_DATA. Used both to materialize
+# NVIDIA_FIN_QUARTERLY in Snowflake and to build its local replica with DuckDB.
+QUARTERLY_ROLLUP_SELECT = """
+    SELECT
+        Ticker,
+        Year,
+        Quarter,
+        MIN(Date) AS PeriodStart,
+        MAX(Date) AS PeriodEnd,
+        COUNT(*) AS TradingDays,
+        MIN_BY(Open, Date) AS QuarterOpen,
+        MAX_BY(Close, Date) AS QuarterEndClose,
+        (MAX_BY(Close, Date) / MIN_BY(Open, Date) - 1) * 100 AS QuarterReturnPercent,
+        MAX(High) AS QuarterHigh,
+        MIN(Low) AS QuarterLow,
+        AVG(Close) AS AvgClose,
+        SUM(Volume) AS TotalVolume,
+        AVG(Volume) AS AvgVolume,
+        SUM(DollarVolume) AS TotalDollarVolume,
+        AVG(DollarVolume) AS AvgDollarVolume,
+        AVG(DailyChangePercent) AS AvgDailyChangePercent,
+        AVG(RSI) AS AvgRSI,
+        MIN(RSI) AS MinRSI,
+        MAX(RSI) AS MaxRSI,
+        AVG(Volatility20D) AS AvgVolatility20D,
+        MAX_BY(MA10, Date) AS QuarterEndMA10,
+        MAX_BY(MA30, Date) AS QuarterEndMA30
+    FROM {source}
+    GROUP BY Ticker, Year, Quarter
+"""
+
+def build_quarterly_rollup(df):
+    """Computes the NVIDIA_FIN_QUARTERLY rollup from the daily frame (for the local replica)."""
+    import duckdb
+    con = duckdb.connect()
+    try:
+        con.register("daily", df)
+        return con.execute(QUARTERLY_ROLLUP_SELECT.format(source="daily") + " ORDER BY Ticker, Year, Quarter").fetchdf()
+    finally:
+        con.close()
+
+def add_technical_indicators(df):
+    """
+    Adds daily change, dollar volume, MA10/MA30, 20-day volatility and RSI columns.
+    df may hold one or many tickers; rows come back sorted by ticker and date.
+    """
+    return compute_indicators(df)
+
+def build_peer_dataset(tickers=PEER_TICKERS, period="5y", output_dir=PEER_DATASET_DIR):
+    """
+    Downloads daily history for NVIDIA and its peers in one request, computes the
+    indicators for all tickers in one pass and writes Parquet partitioned by ticker and year.
+    """
+    print(f"🔍 Fetching daily historical data for {', '.join(tickers)} over {period}...")
+    hist_data = yf.download(list(tickers), period=period, auto_adjust=True, group_by="ticker", progress=False)
+    # Wide (ticker, field) columns -> one long frame with a Ticker column
+    df = hist_data.stack(level=0, future_stack=True).rename_axis(["Date", "Ticker"]).reset_index()
+    df = df.dropna(subset=["Close"])
+    df = add_period_columns(add_technical_indicators(df))
+    write_partitioned_parquet(df[TABLE_COLUMNS], output_dir)
+    print(f"✅ Wrote {len(df)} rows for {df['Ticker'].nunique()} tickers to {output_dir}")
+    return df
+
 def create_daily_historical_report(ticker="NVDA", period="5y", output_file=None):
     """
     Create a report with daily historical data and technical indicators
@@ -34,54 +119,7 @@ def create_daily_historical_report(ticker="NVDA", period="5y", output_file=None)
         # Add ticker column as the first column
         df.insert(0, 'Ticker', ticker)
         
-        # Some additional calculated columns that change daily
-        if 'Close' in df.columns and 'Open' in df.columns:
-            df['DailyChange'] = df['Close'] - df['Open']
-            df['DailyChangePercent'] = (df['Close'] / df['Open'] - 1) * 100
-        
-        if 'Volume' in df.columns and 'Close' in df.columns:
-            df['DollarVolume'] = df['Volume'] * df['Close']
-        
-        # Calculate 10-day and 30-day moving averages
-        # Handle NaN values for initial periods by filling with the value itself
-        if 'Close' in df.columns:
-            df['MA10'] = df['Close'].rolling(window=10, min_periods=1).mean()
-            df['MA30'] = df['Close'].rolling(window=30, min_periods=1).mean()
-        
-        # Calculate volatility (standard deviation of returns over 20 days)
-        if 'Close' in df.columns:
-            # Calculate returns first
-            df['Returns'] = df['Close'].pct_change()
-            
-            # Handle initial NaN value in Returns
-            df['Returns'] = df['Returns'].fillna(0)
-            
-            # Calculate volatility with min_periods=1 to handle initial values
-            df['Volatility20D'] = df['Returns'].rolling(window=20, min_periods=1).std() * (252 ** 0.5)
-        
-        # Calculate Relative Strength Index (RSI)
-        if 'Close' in df.columns:
-            delta = df['Close'].diff()
-            # Handle initial NaN value
-            delta = delta.fillna(0)
-            
-            up = delta.clip(lower=0)
-            down = -1 * delta.clip(upper=0)
-            
-            # Instead of ewm which produces initial NaNs, use rolling with expanding
-            # for the initial periods
-            up_mean = up.rolling(window=14, min_periods=1).mean()
-            down_mean = down.rolling(window=14, min_periods=1).mean()
-            
-            # Avoid division by zero
-            down_mean = down_mean.replace(0, np.finfo(float).eps)
-            
-            rs = up_mean / down_mean
-            df['RSI'] = 100 - (100 / (1 + rs))
-        
-        # Remove intermediate calculation columns
-        if 'Returns' in df.columns:
-            df = df.drop('Returns', axis=1)
+        df = add_technical_indicators(df)
         
         # Remove Dividends and Stock Splits columns if they exist
         if 'Dividends' in df.columns:
@@ -106,21 +144,25 @@ def create_daily_historical_report(ticker="NVDA", period="5y", output_file=None)
         traceback.print_exc()
         return None
 
-def upload_csv_to_s3(df):
+def add_period_columns(df):
+    """Adds the Year and Quarter columns the agent filters on."""
+    df['Year'] = df['Date'].dt.year
+    df['Quarter'] = df['Date'].dt.quarter
+    return df
+
+def upload_csv_to_s3(df, filename="nvidia_data.csv"):
     # Convert DataFrame to CSV in memory (without index)
     output_buffer = io.StringIO()
     df.to_csv(output_buffer, index=False)
     output_buffer.seek(0)  # Go to the beginning of the StringIO object
 
-    # Generate the filename with timestamp
-    filename = f"nvidia_data.csv"
-
     # Upload the CSV to S3
     s3_utils.upload_file_to_s3(output_buffer.getvalue(), filename, "csvFile")
 
     print("File uploaded to s3")
 
-def snowflake_connector():
+def connect_snowflake():
+    """Connects to Snowflake and makes sure the warehouse, database and schema exist and are in use."""
     # Snowflake connection details
     SNOWFLAKE_ACCOUNT = os.getenv("SNOWFLAKE_ACCOUNT")  # e.g. 'vwcoqxf-qtb83828'
     SNOWFLAKE_USER = os.getenv("SNOWFLAKE_USER")  # Your Snowflake username
@@ -158,7 +200,12 @@ def snowflake_connector():
     """)
 
     cur.execute("USE SCHEMA NVIDIA_DB.NVIDIA_SCHEMA;")  # Specify the schema
+    cur.close()
+    return conn
 
+def snowflake_connector():
+    conn = connect_snowflake()
+    cur = conn.cursor()
     # Create Storage Integration
     def create_storage_integration(cur):
         cur.execute("""
@@ -189,10 +236,11 @@ def snowflake_connector():
             FILE_FORMAT = (FORMAT_NAME = 'NVIDIA_CSV_FORMAT');
         """)
 
-    # Create Table by Inferring Schema
+    # Create a staging table; the live table is swapped with it once loaded,
+    # so NVIDIA_FIN_DATA is never empty while a full reload runs
     def create_table(cur):
         cur.execute("""
-            CREATE OR REPLACE TABLE NVIDIA_FIN_DATA (
+            CREATE OR REPLACE TABLE NVIDIA_FIN_DATA_STAGING (
                 Ticker STRING,
                 Date TIMESTAMP,
                 Open FLOAT,
@@ -215,18 +263,33 @@ def snowflake_connector():
     # Load Data into Snowflake Table from Stage
     def load_data_into_snowflake(cur):
         cur.execute("""
-            COPY INTO NVIDIA_FIN_DATA
+            COPY INTO NVIDIA_FIN_DATA_STAGING
             FROM @NVIDIA_STAGE
             FILES = ('nvidia_data.csv')
             FILE_FORMAT = (FORMAT_NAME = 'NVIDIA_CSV_FORMAT')
         """)
 
+    # Atomically replace the live table with the freshly loaded one
+    def swap_into_place(cur):
+        cur.execute("CREATE TABLE IF NOT EXISTS NVIDIA_FIN_DATA LIKE NVIDIA_FIN_DATA_STAGING")
+        cur.execute("ALTER TABLE NVIDIA_FIN_DATA SWAP WITH NVIDIA_FIN_DATA_STAGING")
+        cur.execute("DROP TABLE IF EXISTS NVIDIA_FIN_DATA_STAGING")
+
+    # Materialize the per-quarter rollup so aggregate questions scan a few rows
+    def create_quarterly_rollup(cur):
+        cur.execute(
+            "CREATE OR REPLACE TABLE NVIDIA_FIN_QUARTERLY AS"
+            + QUARTERLY_ROLLUP_SELECT.format(source="NVIDIA_FIN_DATA")
+        )
+
     # Calling functions
     create_storage_integration(cur)
     create_csv_format(cur)
     create_stage(cur)
     create_table(cur)
     load_data_into_snowflake(cur)
+    swap_into_place(cur)
+    create_quarterly_rollup(cur)
 
     conn.commit()
     cur.close()
@@ -235,14 +298,184 @@ def snowflake_connector():
     
 
 
-# Example usage
-if __name__ == "__main__":
-    df = create_daily_historical_report("NVDA", "5y")
-    # Create 'year' column by extracting the year from 'Date'
-    df['Year'] = df['Date'].dt.year
+def tail_state_path(ticker):
+    return Path("data") / f"{ticker}_indicator_tail.parquet"
 
-    # Create 'quarter' column by extracting the quarter from 'Date'
-    df['Quarter'] = df['Date'].dt.quarter
+def load_tail_state(ticker):
+    """Last TAIL_ROWS loaded rows of a ticker, persisted by the previous load (or None)."""
+    path = tail_state_path(ticker)
+    if not path.exists():
+        return None
+    return pd.read_parquet(path)
+
+def save_tail_state(ticker, df):
+    path = tail_state_path(ticker)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tail = df[TABLE_COLUMNS].tail(TAIL_ROWS).copy()
+    # Stored like NVIDIA_FIN_DATA: exchange wall-clock time without a zone
+    if tail['Date'].dt.tz is not None:
+        tail['Date'] = tail['Date'].dt.tz_localize(None)
+    tail.to_parquet(path, index=False)
+
+def to_table_frame(df):
+    """Maps Snowflake's upper-case result columns back to the table's column names."""
+    names = {column.upper(): column for column in TABLE_COLUMNS}
+    return df.rename(columns=lambda column: names.get(column.upper(), column))
+
+def fetch_tail_from_snowflake(cur, ticker):
+    cur.execute(
+        f"SELECT {', '.join(TABLE_COLUMNS)} FROM NVIDIA_FIN_DATA WHERE Ticker = %s ORDER BY Date DESC LIMIT {TAIL_ROWS}",
+        (ticker,)
+    )
+    return to_table_frame(cur.fetch_pandas_all()).sort_values("Date").reset_index(drop=True)
+
+def compute_incremental_rows(tail, new_rows):
+    """
+    Computes indicators for new_rows from the tail window of already loaded rows.
+    With INDICATOR_WINDOW rows of history the values match a full recompute.
+    """
+    base_columns = ['Ticker', 'Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+    tail = tail.tail(INDICATOR_WINDOW)
+    frame = pd.concat([tail[base_columns], new_rows[base_columns]], ignore_index=True)
+    frame = add_technical_indicators(frame)
+    return add_period_columns(frame.iloc[len(tail):].copy())[TABLE_COLUMNS]
+
+def full_load(ticker="NVDA", period="5y"):
+    """Reloads the full history: staged CSV load swapped into place, rollup and replicas rebuilt."""
+    df = create_daily_historical_report(ticker, period)
+    df = add_period_columns(df)
     print(len(df), type(df), df.columns)
     upload_csv_to_s3(df)
     snowflake_connector()
+    save_tail_state(ticker, df)
+    # Refresh the local replica the Snowflake agent queries by default
+    write_replica(df, "NVIDIA_FIN_DATA")
+    write_replica(build_quarterly_rollup(df), "NVIDIA_FIN_QUARTERLY")
+
+def incremental_load(ticker="NVDA", period="5y"):
+    """
+    Loads the trading days from the last loaded date on and MERGEs them in. The last
+    loaded day is fetched again because a load during market hours stored a partial
+    bar for it; the MERGE updates that row with the final values.
+
+    Indicators for the new days are computed from the persisted tail window, so a
+    refresh costs O(new days). Falls back to full_load when the table is empty or
+    a split/dividend in the new days means yfinance has re-adjusted past prices.
+    """
+    conn = connect_snowflake()
+    cur = conn.cursor()
+    try:
+        try:
+            cur.execute("SELECT MAX(Date) FROM NVIDIA_FIN_DATA WHERE Ticker = %s", (ticker,))
+            last_loaded = cur.fetchone()[0]
+        except snowflake.connector.errors.ProgrammingError:
+            last_loaded = None
+        if last_loaded is None:
+            print(f"No rows loaded for {ticker} yet, running a full load")
+            full_load(ticker, period)
+            return
+
+        last_loaded = pd.Timestamp(last_loaded)
+        hist_data = yf.Ticker(ticker).history(start=last_loaded.date(), auto_adjust=True)
+        new_rows = hist_data.reset_index()
+        if new_rows.empty:
+            print(f"{ticker} is up to date (last loaded {last_loaded.date()})")
+            return
+        new_rows.insert(0, 'Ticker', ticker)
+        # NVIDIA_FIN_DATA stores exchange wall-clock times without a zone
+        if new_rows['Date'].dt.tz is not None:
+            new_rows['Date'] = new_rows['Date'].dt.tz_localize(None)
+        new_rows = new_rows[new_rows['Date'] >= last_loaded]
+        if new_rows.empty:
+            print(f"{ticker} is up to date (last loaded {last_loaded.date()})")
+            return
+
+        corporate_actions = [column for column in ('Dividends', 'Stock Splits') if column in new_rows.columns]
+        if (new_rows[corporate_actions] != 0).any().any():
+            print(f"Corporate action in new {ticker} data re-adjusts past prices, running a full load")
+            full_load(ticker, period)
+            return
+
+        tail = load_tail_state(ticker)
+        if tail is None or pd.Timestamp(tail['Date'].max()) != last_loaded:
+            tail = fetch_tail_from_snowflake(cur, ticker)
+        price_columns = ['Open', 'High', 'Low', 'Close', 'Volume']
+        if (new_rows['Date'] == last_loaded).all() and np.allclose(
+            new_rows[price_columns].to_numpy(dtype=float), tail[price_columns].tail(1).to_numpy(dtype=float)
+        ):
+            print(f"{ticker} is up to date (last loaded {last_loaded.date()})")
+            return
+        # History before the re-fetched days; their rows are recomputed and replaced
+        history = tail[tail['Date'] < new_rows['Date'].min()]
+        delta = compute_incremental_rows(history, new_rows)
+
+        delta_file = f"nvidia_data_delta_{last_loaded.strftime('%Y%m%d')}.csv"
+        upload_csv_to_s3(delta, delta_file)
+        cur.execute("CREATE OR REPLACE TEMPORARY TABLE NVIDIA_FIN_DATA_DELTA LIKE NVIDIA_FIN_DATA")
+        cur.execute(f"""
+            COPY INTO NVIDIA_FIN_DATA_DELTA
+            FROM @NVIDIA_STAGE
+            FILES = ('{delta_file}')
+            FILE_FORMAT = (FORMAT_NAME = 'NVIDIA_CSV_FORMAT')
+        """)
+        update_columns = [column for column in TABLE_COLUMNS if column not in ('Ticker', 'Date')]
+        cur.execute(f"""
+            MERGE INTO NVIDIA_FIN_DATA t
+            USING NVIDIA_FIN_DATA_DELTA s
+            ON t.Ticker = s.Ticker AND t.Date = s.Date
+            WHEN MATCHED THEN UPDATE SET {', '.join(f't.{column} = s.{column}' for column in update_columns)}
+            WHEN NOT MATCHED THEN INSERT ({', '.join(TABLE_COLUMNS)})
+                VALUES ({', '.join(f's.{column}' for column in TABLE_COLUMNS)})
+        """)
+
+        # Recompute only the rollup rows of the quarters that received new days
+        affected = "(SELECT DISTINCT Ticker AS T, Year AS Y, Quarter AS Q FROM NVIDIA_FIN_DATA_DELTA) k"
+        cur.execute("CREATE TABLE IF NOT EXISTS NVIDIA_FIN_QUARTERLY AS" + QUARTERLY_ROLLUP_SELECT.format(source="NVIDIA_FIN_DATA"))
+        cur.execute("BEGIN")
+        cur.execute(f"""
+            DELETE FROM NVIDIA_FIN_QUARTERLY USING {affected}
+            WHERE NVIDIA_FIN_QUARTERLY.Ticker = k.T AND NVIDIA_FIN_QUARTERLY.Year = k.Y AND NVIDIA_FIN_QUARTERLY.Quarter = k.Q
+        """)
+        cur.execute(
+            "INSERT INTO NVIDIA_FIN_QUARTERLY"
+            + QUARTERLY_ROLLUP_SELECT.format(
+                source=f"NVIDIA_FIN_DATA d JOIN {affected} ON d.Ticker = k.T AND d.Year = k.Y AND d.Quarter = k.Q"
+            )
+        )
+        cur.execute("COMMIT")
+        print(f"Merged {len(delta)} rows for {ticker} ({delta['Date'].min().date()} to {delta['Date'].max().date()})")
+
+        save_tail_state(ticker, pd.concat([history, delta], ignore_index=True))
+        update_replicas(cur, delta)
+    finally:
+        cur.close()
+        conn.close()
+
+def update_replicas(cur, delta):
+    """Appends merged rows to the local replica (pulling the table once if there is none) and rebuilds the rollup."""
+    path = replica_path("NVIDIA_FIN_DATA")
+    if os.path.exists(path):
+        replica = to_table_frame(pd.read_parquet(path))
+        replica = pd.concat([replica, delta], ignore_index=True)
+    else:
+        cur.execute(f"SELECT {', '.join(TABLE_COLUMNS)} FROM NVIDIA_FIN_DATA")
+        replica = to_table_frame(cur.fetch_pandas_all())
+    replica = replica.drop_duplicates(subset=['Ticker', 'Date'], keep='last').sort_values(['Ticker', 'Date'])
+    write_replica(replica, "NVIDIA_FIN_DATA")
+    write_replica(build_quarterly_rollup(replica), "NVIDIA_FIN_QUARTERLY")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load daily NVIDIA market data into Snowflake")
+    parser.add_argument("--full", action="store_true", help="Reload the full history instead of only new days")
+    parser.add_argument("--ticker", default="NVDA")
+    parser.add_argument("--period", default="5y", help="History length for a full load")
+    parser.add_argument("--peers", action="store_true", help="Also rebuild the partitioned Parquet dataset of peer tickers")
+    args = parser.parse_args()
+
+    if args.peers:
+        build_peer_dataset(period=args.period)
+    if args.full:
+        full_load(args.ticker, args.period)
+    else:
+        incremental_load(args.ticker, args.period)
@@ -0,0 +1,139 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from agents.sql_guardrails import STATEMENT_TIMEOUT_SECONDS
+
+load_dotenv()
+
+SNOWFLAKE_DATABASE = "NVIDIA_DB"
+SNOWFLAKE_SCHEMA = "NVIDIA_SCHEMA"
+
+
+class SnowflakeConnectionPool:
+    """
+    Process-wide pool of Snowflake connections with database and schema preset.
+
+    Connections are reused across queries so login cost is paid once per worker.
+    At most max_size connections exist at a time; idle connections older than
+    idle_timeout seconds are closed, and a connection idle for longer than
+    health_check_after seconds is checked with SELECT 1 before being reused.
+    """
+
+    def __init__(self, max_size=4, idle_timeout=600, health_check_after=60):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self._idle = []  # [(connection, last_used)]
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def _connect(self):
+        # Imported on first connection so importing the pool stays cheap
+        import snowflake.connector
+        return snowflake.connector.connect(
+            user=os.getenv("SNOWFLAKE_USER"),
+            password=os.getenv("SNOWFLAKE_PASSWORD"),
+            account=os.getenv("SNOWFLAKE_ACCOUNT"),
+            role=os.getenv("SNOWFLAKE_ROLE"),
+            warehouse=os.getenv("SNOWFLAKE_WAREHOUSE"),
+            database=SNOWFLAKE_DATABASE,
+            schema=SNOWFLAKE_SCHEMA,
+            # Server-side cap on any query run through the pool
+            session_parameters={"STATEMENT_TIMEOUT_IN_SECONDS": STATEMENT_TIMEOUT_SECONDS}
+        )
+
+    def _is_healthy(self, conn, last_used):
+        if conn.is_closed():
+            return False
+        if time.monotonic() - last_used < self.health_check_after:
+            return True
+        try:
+            cur = conn.cursor()
+            try:
+                cur.execute("SELECT 1")
+            finally:
+                cur.close()
+            return True
+        except Exception:
+            return False
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _evict_idle(self):
+        """Closes connections that have been idle for longer than idle_timeout."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [conn for conn, last_used in self._idle if now - last_used > self.idle_timeout]
+            self._idle = [(conn, last_used) for conn, last_used in self._idle if now - last_used <= self.idle_timeout]
+        for conn in expired:
+            self._close_quietly(conn)
+
+    def acquire(self):
+        """Returns a healthy connection, blocking while max_size connections are in use."""
+        self._slots.acquire()
+        try:
+            self._evict_idle()
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    conn, last_used = self._idle.pop()
+                if self._is_healthy(conn, last_used):
+                    return conn
+                self._close_quietly(conn)
+            return self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn, broken=False):
+        """Returns a connection to the pool, or closes it if it is broken."""
+        try:
+            if broken or conn.is_closed():
+                self._close_quietly(conn)
+            else:
+                with self._lock:
+                    self._idle.append((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+        self._evict_idle()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that borrows a connection for the duration of the block."""
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except Exception as e:
+            from snowflake.connector.errors import DatabaseError
+            broken = isinstance(e, DatabaseError) and conn.is_closed()
+            raise
+        finally:
+            self.release(conn, broken=broken)
+
+    def close_all(self):
+        """Closes every idle connection (e.g. on shutdown)."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_snowflake_pool():
+    """Returns the process-wide Snowflake connection pool."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = SnowflakeConnectionPool(max_size=int(os.getenv("SNOWFLAKE_POOL_SIZE", "4")))
+        return _POOL
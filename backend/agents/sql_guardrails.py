@@ -0,0 +1,177 @@
+import os
+import re
+import json
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Most rows a Snowflake-mode query may return; one extra row is fetched to detect truncation
+MAX_RESULT_ROWS = int(os.getenv("SNOWFLAKE_MAX_RESULT_ROWS", "10000"))
+
+# Seconds before a running query is cancelled
+STATEMENT_TIMEOUT_SECONDS = int(os.getenv("SNOWFLAKE_STATEMENT_TIMEOUT", "30"))
+
+# Tables with at most this many micro-partitions are always cheap to scan
+FULL_SCAN_MIN_PARTITIONS = int(os.getenv("SNOWFLAKE_FULL_SCAN_MIN_PARTITIONS", "16"))
+
+_WRITE_KEYWORDS = {
+    "INSERT", "UPDATE", "DELETE", "MERGE", "CREATE", "DROP", "ALTER", "TRUNCATE", "REPLACE",
+    "GRANT", "REVOKE", "COPY", "PUT", "GET", "REMOVE", "CALL", "EXECUTE", "USE", "SET", "UNSET",
+    "BEGIN", "COMMIT", "ROLLBACK", "UNDROP", "COMMENT",
+}
+_STRING_OR_COMMENT = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/", re.DOTALL)
+_TRAILING_LIMIT = re.compile(r"\bLIMIT\s+(\d+)\s*$", re.IGNORECASE)
+# Any trailing row-limiting clause: LIMIT n [OFFSET m], [OFFSET m ROWS] FETCH FIRST n ROWS ONLY, OFFSET m
+_TRAILING_ROW_CLAUSE = re.compile(
+    r"(?:\bLIMIT\s+(?P<limit>\d+|NULL)(?:\s+OFFSET\s+\d+)?"
+    r"|(?:\bOFFSET\s+\d+(?:\s+ROWS?)?\s+)?\bFETCH(?:\s+(?:FIRST|NEXT))?(?:\s+(?P<fetch>\d+))?(?:\s+ROWS?)?(?:\s+ONLY)?"
+    r"|\bOFFSET\s+\d+(?:\s+ROWS?)?)\s*$",
+    re.IGNORECASE
+)
+_TOKEN = re.compile(r"''|[A-Za-z_][A-Za-z0-9_$]*|\S")
+_PREDICATE_KEYWORDS = {"WHERE", "QUALIFY"}
+# Keywords that end a WHERE/QUALIFY predicate at the same nesting level
+_CLAUSE_KEYWORDS = {
+    "GROUP", "ORDER", "HAVING", "QUALIFY", "WHERE", "LIMIT", "OFFSET", "FETCH", "WINDOW",
+    "UNION", "EXCEPT", "INTERSECT", "MINUS", "SELECT",
+}
+_PERIOD_COLUMNS = {"YEAR", "QUARTER", "DATE"}
+
+
+class QueryRejected(Exception):
+    """Raised when generated SQL fails a guardrail and must not run."""
+
+
+def _code_only(sql, keep_identifiers=False):
+    """
+    Blanks out string literals, quoted identifiers and comments. With keep_identifiers,
+    quoted identifiers become bare words instead (e.g. "Year" -> Year).
+    """
+    def blank(match):
+        text = match.group(0)
+        if text.startswith(("--", "/*")):
+            return " "
+        if keep_identifiers and text.startswith('"'):
+            return " " + re.sub(r"\W+", "_", text[1:-1]) + " "
+        return "''"
+    return _STRING_OR_COMMENT.sub(blank, sql)
+
+
+def check_read_only(sql):
+    """Returns the statement without a trailing semicolon if it is a single read-only query."""
+    statement = sql.strip().rstrip(";").strip()
+    code = _code_only(statement)
+    if ";" in code:
+        raise QueryRejected("Only a single statement is allowed")
+    words = re.findall(r"([A-Z_]+)(\s*\()?", code.upper())
+    if not words or words[0][0] not in ("SELECT", "WITH"):
+        raise QueryRejected("Only SELECT queries are allowed")
+    # Keywords followed by "(" are function calls such as REPLACE() or GET()
+    forbidden = sorted({word for word, call in words if word in _WRITE_KEYWORDS and not call})
+    if forbidden:
+        raise QueryRejected(f"Query contains non-read-only keywords: {', '.join(forbidden)}")
+    return statement
+
+
+def _predicates(code):
+    """
+    Token lists of every WHERE/QUALIFY predicate in code-only SQL, at any nesting level
+    except inside subqueries of another predicate (those filter the subquery, not the scan).
+    """
+    tokens = [token.upper() for token in _TOKEN.findall(code)]
+    predicates, in_subquery = [], set()
+    for start, token in enumerate(tokens):
+        if token not in _PREDICATE_KEYWORDS or start in in_subquery:
+            continue
+        depth, subquery_depth, predicate = 0, None, []
+        for position in range(start + 1, len(tokens)):
+            token = tokens[position]
+            if token == "(":
+                depth += 1
+            elif token == ")":
+                depth -= 1
+                if depth < 0:
+                    break
+                if subquery_depth is not None and depth < subquery_depth:
+                    subquery_depth = None
+                continue
+            elif token == "SELECT" and tokens[position - 1] == "(" and subquery_depth is None:
+                subquery_depth = depth
+            elif depth == 0 and token in _CLAUSE_KEYWORDS:
+                break
+            if subquery_depth is None:
+                predicate.append(token)
+            else:
+                in_subquery.add(position)
+        predicates.append(predicate)
+    return predicates
+
+
+def has_period_filter(sql):
+    """
+    True if a WHERE or QUALIFY predicate references Year, Quarter or Date.
+    Period columns elsewhere (select lists, ORDER BY, subqueries) and DATE '...'
+    literals don't count.
+    """
+    for predicate in _predicates(_code_only(sql, keep_identifiers=True)):
+        for i, token in enumerate(predicate):
+            is_literal = i + 1 < len(predicate) and predicate[i + 1] == "''"
+            if token in _PERIOD_COLUMNS and not is_literal:
+                return True
+    return False
+
+
+def apply_row_limit(sql, max_rows=MAX_RESULT_ROWS):
+    """
+    Caps the rows a query returns at max_rows + 1 (the extra row marks truncation).
+    A trailing bare LIMIT above the cap is lowered; other row clauses (OFFSET, FETCH)
+    above the cap, or without a count, are kept and the query is wrapped instead.
+    """
+    cap = max_rows + 1
+    code = _code_only(sql)
+    match = _TRAILING_ROW_CLAUSE.search(code)
+    if not match:
+        # On its own line so a trailing comment cannot swallow it
+        return f"{sql}\nLIMIT {cap}"
+    count = match.group("limit") or match.group("fetch")
+    if count and count.isdigit() and int(count) <= cap:
+        return sql
+    if _TRAILING_LIMIT.search(code) and _TRAILING_LIMIT.search(sql):
+        return _TRAILING_LIMIT.sub(f"LIMIT {cap}", sql)
+    return f"SELECT * FROM (\n{sql}\n) LIMIT {cap}"
+
+
+def prepare_query(sql, max_rows=MAX_RESULT_ROWS, require_filter=False):
+    """
+    Validates LLM-written SQL and returns the statement to run.
+
+    The query must be a single read-only statement; if require_filter is set it
+    must filter on the period columns. A row limit is injected.
+    """
+    statement = check_read_only(sql)
+    if require_filter and not has_period_filter(statement):
+        raise QueryRejected("Query does not filter on Year, Quarter or Date although periods were requested")
+    return apply_row_limit(statement, max_rows)
+
+
+def check_explain(cur, sql):
+    """
+    Runs EXPLAIN on Snowflake and rejects plans that scan every micro-partition
+    of a large table (i.e. the period filter prunes nothing).
+    """
+    cur.execute(f"EXPLAIN USING JSON {sql}")
+    plan = json.loads(cur.fetchone()[0])
+    stats = plan.get("GlobalStats", {})
+    total = stats.get("partitionsTotal", 0)
+    assigned = stats.get("partitionsAssigned", 0)
+    if total > FULL_SCAN_MIN_PARTITIONS and assigned >= total:
+        raise QueryRejected(f"Query plan scans all {total} partitions although periods were requested")
+
+
+def truncate_result(df, max_rows=MAX_RESULT_ROWS):
+    """Drops the sentinel row fetched past the cap, marking the frame as truncated."""
+    if len(df) > max_rows:
+        print(f"Query result truncated to {max_rows} rows")
+        df = df.iloc[:max_rows].copy()
+        df.attrs["truncated"] = True
+    return df
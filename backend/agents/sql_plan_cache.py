@@ -0,0 +1,203 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SQL_PLAN_CACHE_PATH = os.getenv("SQL_PLAN_CACHE_PATH", "data/sql_plan_cache.json")
+SQL_PLAN_CACHE_SIZE = int(os.getenv("SQL_PLAN_CACHE_SIZE", "256"))
+
+# Minimum cosine similarity for two differently worded questions to share a plan.
+# MiniLM scores opposites such as "highest close" / "lowest close" above 0.9, so
+# similar questions must also agree on their _PLAN_WORDS (see plan_signature).
+SIMILARITY_THRESHOLD = float(os.getenv("SQL_PLAN_SIMILARITY", "0.98"))
+
+# Placeholder the planner writes where the Year/Quarter filter belongs
+PERIOD_PLACEHOLDER = "{PERIOD_FILTER}"
+
+_PERIOD_WORDS = re.compile(r"\b(?:19|20)\d{2}\b|\bq[1-4]\b|\b(?:first|second|third|fourth)\s+quarter\b|\bfy\d*\b")
+
+
+# Words that change the SQL a question needs: comparatives, aggregates, directions and metrics
+_PLAN_WORDS = {
+    "highest", "lowest", "high", "low", "max", "maximum", "min", "minimum", "top", "bottom",
+    "best", "worst", "most", "least", "largest", "smallest", "biggest", "peak",
+    "average", "avg", "mean", "median", "total", "sum", "count", "number", "std", "volatility",
+    "increase", "decrease", "rise", "rose", "fall", "fell", "gain", "gains", "loss", "losses",
+    "up", "down", "above", "below", "over", "under", "more", "less", "greater", "fewer",
+    "first", "last", "daily", "weekly", "monthly", "quarterly", "yearly", "annual",
+    "compare", "comparison", "versus", "vs", "difference", "change", "return", "returns", "growth",
+    "open", "close", "closing", "opening", "price", "volume", "dollar", "rsi", "ma10", "ma30",
+    "moving", "trend", "not", "without", "except",
+}
+
+
+def normalize_query(query):
+    """Lowercases a question and drops period mentions and punctuation, which don't change the SQL template."""
+    text = _PERIOD_WORDS.sub(" ", query.lower())
+    return " ".join(re.findall(r"[a-z0-9_]+", text))
+
+
+def plan_signature(intent):
+    """The words of a normalized question that change its SQL, plus any numbers (e.g. "top 5")."""
+    return sorted({word for word in intent.split() if word in _PLAN_WORDS or word.isdigit()})
+
+
+def period_key(year_quarter_dict):
+    """Canonical string for a year -> quarters selection."""
+    return json.dumps({str(year): sorted(str(q) for q in quarters) for year, quarters in sorted(year_quarter_dict.items())})
+
+
+def period_filter(year_quarter_dict):
+    """SQL filter for the selected years/quarters, built from validated integers only."""
+    clauses = [
+        f"(Year = {int(year)} AND Quarter IN ({', '.join(str(int(q)) for q in quarters)}))"
+        for year, quarters in sorted(year_quarter_dict.items()) if quarters
+    ]
+    return "(" + " OR ".join(clauses) + ")" if clauses else "(1 = 1)"
+
+
+def bind_periods(plan, year_quarter_dict):
+    """Returns a copy of a parameterized plan with the period filter bound for the given periods."""
+    bound = dict(plan)
+    for key in ("aggregated_query", "raw_query"):
+        bound[key] = plan[key].replace(PERIOD_PLACEHOLDER, period_filter(year_quarter_dict))
+    return bound
+
+
+def is_parameterized(plan):
+    return all(PERIOD_PLACEHOLDER in plan[key] for key in ("aggregated_query", "raw_query"))
+
+
+def schema_fingerprint(columns):
+    """Hashes a table's (name, type) columns; cached plans are dropped when it changes."""
+    text = "\n".join(f"{name.upper()} {data_type.upper()}" for name, data_type in sorted(columns))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _default_embed(text):
+    # The same model instance the Pinecone assistant embeds with
+    from embedding_cache import get_sentence_model
+    return get_sentence_model().encode(text, normalize_embeddings=True)
+
+
+class SqlPlanCache:
+    """
+    LRU cache of validated SQL plans keyed by question intent and period selection.
+
+    A lookup first tries the exact (normalized question, periods) key, then the most
+    similar cached question by embedding, which must also have the same plan_signature
+    (comparatives, aggregates and metrics) so "highest" never reuses a "lowest" plan. Parameterized plans (period filter left as
+    PERIOD_PLACEHOLDER) are reused for any periods by binding the new filter; other
+    plans are only reused for the periods they were generated for. The cache is
+    persisted to disk and cleared whenever the table schema fingerprint changes.
+    """
+
+    def __init__(self, path=SQL_PLAN_CACHE_PATH, max_entries=SQL_PLAN_CACHE_SIZE,
+                 similarity_threshold=SIMILARITY_THRESHOLD, embed=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.embed = embed or _default_embed
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # "intent|periods" -> entry, least recently used first
+        self._schema = None
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self._schema = data.get("schema")
+                self._entries = OrderedDict((entry["key"], entry) for entry in data.get("entries", []))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Ignoring unreadable SQL plan cache: {e}")
+
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"schema": self._schema, "entries": list(self._entries.values())}, f)
+        os.replace(tmp_path, self.path)
+
+    def _check_schema(self, schema):
+        """Drops every entry if the table schema changed since they were cached."""
+        if schema != self._schema:
+            if self._entries:
+                print("Table schema changed, invalidating cached SQL plans")
+            self._entries.clear()
+            self._schema = schema
+            self._save()
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._save()
+
+    def get(self, query, year_quarter_dict, schema):
+        """Returns a plan bound to year_quarter_dict, or None on a miss."""
+        intent = normalize_query(query)
+        periods = period_key(year_quarter_dict)
+        with self._lock:
+            self._check_schema(schema)
+            entry = self._entries.get(f"{intent}|{periods}")
+            if entry is None:
+                entry = self._most_similar(intent, periods)
+            if entry is None:
+                return None
+            self._entries.move_to_end(entry["key"])
+            plan = dict(entry["plan"])
+        return bind_periods(plan, year_quarter_dict) if is_parameterized(plan) else plan
+
+    def _most_similar(self, intent, periods):
+        signature = plan_signature(intent)
+        candidates = [
+            entry for entry in self._entries.values()
+            if (entry["periods"] == periods or is_parameterized(entry["plan"]))
+            and plan_signature(entry["intent"]) == signature
+        ]
+        if not candidates:
+            return None
+        query_vector = np.asarray(self.embed(intent), dtype=np.float32)
+        best, best_score = None, self.similarity_threshold
+        for entry in candidates:
+            vector = np.asarray(entry["embedding"], dtype=np.float32)
+            score = float(np.dot(query_vector, vector) / (np.linalg.norm(query_vector) * np.linalg.norm(vector) or 1.0))
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def put(self, query, year_quarter_dict, plan, schema):
+        """Caches a validated plan (parameterized or already bound to year_quarter_dict)."""
+        intent = normalize_query(query)
+        periods = period_key(year_quarter_dict)
+        embedding = [round(float(x), 5) for x in self.embed(intent)]
+        key = f"{intent}|{periods}"
+        with self._lock:
+            self._check_schema(schema)
+            self._entries[key] = {"key": key, "intent": intent, "periods": periods, "embedding": embedding, "plan": plan}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_sql_plan_cache():
+    """Returns the process-wide SQL plan cache."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = SqlPlanCache()
+        return _CACHE
@@ -1,6 +1,8 @@
 from typing import Dict, List, Any
 from serpapi import GoogleSearch
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from dotenv import load_dotenv
 from datetime import datetime
 from llm_service import generate_response_with_gemini  # Add this import
@@ -9,6 +11,28 @@ from llm_service import generate_response_with_gemini  # Add this import
 load_dotenv()
 SERPAPI_API_KEY = os.getenv("SERPAPI_API_KEY")
 
+# Seconds to wait for each SerpAPI call; slower searches are dropped from the results
+SEARCH_TIMEOUT_SECONDS = float(os.getenv("WEB_SEARCH_TIMEOUT", "8"))
+
+_SEARCH_EXECUTOR = None
+_SEARCH_EXECUTOR_LOCK = threading.Lock()
+
+
+def get_search_executor():
+    """Returns the process-wide thread pool that runs SerpAPI calls."""
+    global _SEARCH_EXECUTOR
+    with _SEARCH_EXECUTOR_LOCK:
+        if _SEARCH_EXECUTOR is None:
+            _SEARCH_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="web-search")
+        return _SEARCH_EXECUTOR
+
+
+def _serpapi_results(search_params):
+    """Runs a SerpAPI Google search; the HTTP request itself times out too, so abandoned calls end."""
+    search = GoogleSearch(search_params)
+    search.timeout = SEARCH_TIMEOUT_SECONDS
+    return search.get_dict()
+
 class WebSearchAgent:
     def __init__(self):
         self.api_key = SERPAPI_API_KEY
@@ -29,8 +53,7 @@ class WebSearchAgent:
                 "tbs": "qdr:m",  # Last month's results
                 "location": "United States"
             }
-            search = GoogleSearch(search_params)
-            results = search.get_dict()
+            results = _serpapi_results(search_params)
             
             formatted_results = []
             if "news_results" in results:
@@ -65,8 +88,7 @@ class WebSearchAgent:
                 "tbs": "qdr:m"  # Last month's results
             }
             
-            search = GoogleSearch(search_params)
-            results = search.get_dict()
+            results = _serpapi_results(search_params)
             
             formatted_results = []
             if "organic_results" in results:
@@ -158,14 +180,38 @@ class WebSearchAgent:
         print("web search analysis: ", analysis)
         return analysis, token_info  # Now also returning token info for tracking
 
+    def run_searches(self, query: str, timeout: float = SEARCH_TIMEOUT_SECONDS) -> Dict[str, Any]:
+        """
+        Run the news and trends searches concurrently, waiting at most `timeout` seconds.
+        A search that has not finished by then contributes no results and is listed
+        under "timed_out"; the other search's results are kept.
+        """
+        executor = get_search_executor()
+        futures = {
+            "news": executor.submit(self.search_news, query),
+            "trends": executor.submit(self.search_trends, query)
+        }
+        done, _ = wait(futures.values(), timeout=timeout)
+        results = {"timed_out": []}
+        for name, future in futures.items():
+            if future in done:
+                results[name] = future.result()
+            else:
+                future.cancel()
+                print(f"{name.capitalize()} search timed out after {timeout}s")
+                results[name] = []
+                results["timed_out"].append(name)
+        return results
+
     def run(self, query: str) -> Dict[str, Any]:
         """
         Modified run method to include synthesis
         """
         try:
-            # Perform searches
-            news_results = self.search_news(query)
-            trend_results = self.search_trends(query)
+            # Perform both searches concurrently; a slow one yields partial results
+            searches = self.run_searches(query)
+            news_results = searches["news"]
+            trend_results = searches["trends"]
             print("news_results: ", news_results)
             print("trend_results: ", trend_results)
             # Generate basic summary
@@ -188,7 +234,8 @@ class WebSearchAgent:
                 "categories": {
                     "has_news": bool(news_results),
                     "has_trends": bool(trend_results)
-                }
+                },
+                "timed_out": searches["timed_out"]
             }
             
         except Exception as e:
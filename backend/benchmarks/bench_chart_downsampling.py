@@ -0,0 +1,77 @@
+"""
+Benchmark Vega-Lite time-series specs with and without LTTB downsampling across date ranges.
+
+Usage:
+    python benchmarks/bench_chart_downsampling.py [--days 63 252 1260 5040 20000]
+
+Three synthetic daily series (like CLOSE/HIGH/LOW) are built into a spec once
+with every point and once downsampled with LTTB to SPEC_SERIES_POINTS; reported
+are build time and the JSON payload, raw and gzipped as the API sends it. The
+PNG path plots every point, so the PNG render is timed alongside for reference.
+"""
+import argparse
+import gzip
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agents import chart_specs
+from agents.chart_renderer import render_time_series
+from agents.chart_specs import time_series_spec
+
+
+def synthetic_series(days, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2000-01-03", periods=days).to_numpy()
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+    return dates, {"CLOSE": close, "HIGH": close * 1.01, "LOW": close * 0.99}
+
+
+def full_spec(x, series, title):
+    """Spec without downsampling: a point budget larger than any series."""
+    original = chart_specs.SPEC_SERIES_POINTS
+    chart_specs.SPEC_SERIES_POINTS = len(x)
+    try:
+        return json.dumps(time_series_spec(x, series, title)).encode()
+    finally:
+        chart_specs.SPEC_SERIES_POINTS = original
+
+
+def best_of(func, repeats=5):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, nargs="+", default=[63, 252, 1260, 5040, 20000])
+    args = parser.parse_args()
+
+    # Warm up font cache and backend
+    render_time_series(*synthetic_series(10), title="warm-up")
+
+    print(f"{'days':>7} | {'full ms':>8} {'full KB':>8} {'gzip KB':>8} | "
+          f"{'lttb ms':>8} {'lttb KB':>8} {'gzip KB':>8} | {'png ms':>7}")
+    for days in args.days:
+        x, series = synthetic_series(days)
+        full_time, full_payload = best_of(lambda: full_spec(x, series, "full"))
+        lttb_time, lttb_payload = best_of(lambda: json.dumps(time_series_spec(x, series, "lttb")).encode())
+        png_time, _ = best_of(lambda: render_time_series(x, series, "png"), repeats=3)
+        print(f"{days:>7} | {full_time * 1000:>8.1f} {len(full_payload) / 1024:>8.1f} "
+              f"{len(gzip.compress(full_payload)) / 1024:>8.1f} | {lttb_time * 1000:>8.1f} "
+              f"{len(lttb_payload) / 1024:>8.1f} {len(gzip.compress(lttb_payload)) / 1024:>8.1f} | "
+              f"{png_time * 1000:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
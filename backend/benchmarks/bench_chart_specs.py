@@ -0,0 +1,86 @@
+"""
+Benchmark Snowflake-mode charts as server-rendered PNGs vs client-rendered Vega-Lite specs.
+
+Usage:
+    python benchmarks/bench_chart_specs.py [--days 63 252 1260 5040]
+
+For synthetic NVIDIA_FIN_DATA-shaped results the time-series and correlation
+charts are built both ways; reported are server CPU time and the bytes the
+client downloads (PNG images vs JSON specs, raw and gzipped as the API sends
+them). PNGs additionally cost one S3 upload and one presign each, which are
+not timed here.
+"""
+import argparse
+import gzip
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agents.chart_renderer import render_chart
+from agents.chart_specs import correlation_spec, time_series_spec
+
+
+def synthetic_charts(days, seed=0):
+    """Keyword arguments of the two charts create_and_save_graph builds."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2020-01-01", periods=days).to_numpy()
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+    df = pd.DataFrame({"CLOSE": close, "HIGH": close * 1.01, "LOW": close * 0.99,
+                       "RSI": rng.uniform(20, 80, days)})
+    time_series = {"x": dates, "series": {col: df[col].to_numpy() for col in ["CLOSE", "HIGH", "LOW"]},
+                   "title": "NVIDIA Key Metrics: CLOSE, HIGH, LOW"}
+    correlation = {"correlation": df.corr(), "title": "Correlation between Key Metrics"}
+    return time_series, correlation
+
+
+def timed(func, repeats=3):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, nargs="+", default=[63, 252, 1260, 5040])
+    args = parser.parse_args()
+
+    try:
+        import seaborn  # noqa: F401 (the correlation PNG needs it)
+        with_heatmap = True
+    except ImportError:
+        print("seaborn is not installed; PNG columns cover the time series only\n")
+        with_heatmap = False
+
+    # Warm up font cache and backend
+    render_chart("time_series", **synthetic_charts(10)[0])
+
+    print(f"{'days':>6} | {'png ms':>7} {'png KB':>7} | {'spec ms':>7} {'spec KB':>7} {'gzip KB':>7}")
+    for days in args.days:
+        time_series, correlation = synthetic_charts(days)
+
+        def pngs():
+            images = [render_chart("time_series", **time_series)]
+            if with_heatmap:
+                images.append(render_chart("correlation", **correlation))
+            return images
+
+        def specs():
+            return json.dumps([time_series_spec(**time_series), correlation_spec(**correlation)]).encode()
+
+        png_ms, images = timed(pngs)
+        spec_ms, payload = timed(specs)
+        print(f"{days:>6} | {png_ms:>7.1f} {sum(map(len, images)) / 1024:>7.1f} | "
+              f"{spec_ms:>7.1f} {len(payload) / 1024:>7.1f} {len(gzip.compress(payload)) / 1024:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark the token-aware chunker against the previous two-way word-count splitter.
+
+Usage:
+    python benchmarks/bench_chunking.py [path/to/filing.md ...]
+
+Without arguments, the largest converted filings under the S3 'markdown/' prefix are used.
+"""
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from markdown_chunking import HEADER_PATTERN, chunk_markdown_by_headers, get_token_counter
+
+MODEL_WINDOW = 254  # all-MiniLM-L6-v2 max_seq_length minus [CLS]/[SEP]
+
+
+def legacy_chunk_markdown_by_headers(markdown_text, ideal_word_count=500):
+    """The previous splitter: header sections, oversized ones halved by word count."""
+    split_threshold = int(1.5 * ideal_word_count)
+    matches = list(HEADER_PATTERN.finditer(markdown_text))
+    if not matches:
+        return [{'header': None, 'level': None, 'content': markdown_text.strip()}]
+    chunks = []
+    for idx, match in enumerate(matches):
+        end_index = matches[idx + 1].start() if idx + 1 < len(matches) else len(markdown_text)
+        chunk_text = markdown_text[match.start():end_index].strip()
+        words = chunk_text.split()
+        if len(words) > split_threshold:
+            mid_point = len(words) // 2
+            chunks.append({'content': " ".join(words[:mid_point]), 'part': 1})
+            chunks.append({'content': " ".join(words[mid_point:]), 'part': 2})
+        else:
+            chunks.append({'content': chunk_text})
+    return chunks
+
+
+def load_largest_filings(limit=3):
+    """Downloads the largest markdown filings from S3."""
+    import os
+    from s3_utils import get_s3_client
+
+    s3_client = get_s3_client()
+    bucket_name = os.getenv('AWS_S3_BUCKET_NAME')
+    objects = []
+    for page in s3_client.get_paginator('list_objects_v2').paginate(Bucket=bucket_name, Prefix="markdown/"):
+        objects.extend(obj for obj in page.get('Contents', []) if obj['Key'].endswith(".md"))
+    objects.sort(key=lambda obj: obj['Size'], reverse=True)
+
+    filings = []
+    for obj in objects[:limit]:
+        body = s3_client.get_object(Bucket=bucket_name, Key=obj['Key'])['Body'].read()
+        filings.append((obj['Key'], body.decode("utf-8")))
+    return filings
+
+
+def measure(chunker, markdown_text, count_tokens):
+    """Returns timing, peak memory and token coverage for one chunker run."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    chunks = chunker(markdown_text)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    token_counts = [count_tokens(chunk['content']) for chunk in chunks]
+    total_tokens = sum(token_counts)
+    embedded_tokens = sum(min(tokens, MODEL_WINDOW) for tokens in token_counts)
+    return {
+        "chunks": len(chunks),
+        "seconds": elapsed,
+        "peak_mb": peak / 1e6,
+        "max_tokens": max(token_counts, default=0),
+        "coverage": embedded_tokens / total_tokens if total_tokens else 1.0,
+    }
+
+
+def main():
+    if len(sys.argv) > 1:
+        filings = [(path, Path(path).read_text(encoding="utf-8")) for path in sys.argv[1:]]
+    else:
+        filings = load_largest_filings()
+
+    count_tokens = get_token_counter()
+    chunkers = {
+        "legacy": legacy_chunk_markdown_by_headers,
+        "token-aware": lambda text: chunk_markdown_by_headers(text, max_tokens=MODEL_WINDOW),
+    }
+
+    print(f"{'filing':40} {'chunker':12} {'chunks':>7} {'sec':>7} {'peak MB':>8} {'max tok':>8} {'embedded':>9}")
+    for name, markdown_text in filings:
+        for chunker_name, chunker in chunkers.items():
+            result = measure(chunker, markdown_text, count_tokens)
+            print(f"{Path(name).name[:40]:40} {chunker_name:12} {result['chunks']:7d} {result['seconds']:7.3f} "
+                  f"{result['peak_mb']:8.2f} {result['max_tokens']:8d} {result['coverage']:9.1%}")
+
+
+if __name__ == "__main__":
+    main()
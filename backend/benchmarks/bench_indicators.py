@@ -0,0 +1,92 @@
+"""
+Benchmark the vectorized multi-ticker indicator engine against the per-ticker pandas passes.
+
+Usage:
+    python benchmarks/bench_indicators.py [--days 1260] [--tickers 1 5 10 25 50]
+
+Synthetic random-walk prices are used so the benchmark runs offline. Both
+implementations are checked to produce the same indicator values.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agents.indicator_engine import compute_indicators
+
+INDICATOR_COLUMNS = ["DailyChange", "DailyChangePercent", "DollarVolume", "MA10", "MA30", "Volatility20D", "RSI"]
+
+
+def legacy_indicators(df):
+    """The previous implementation: one ticker at a time, one pandas pass per indicator."""
+    frames = []
+    for _, group in df.groupby("Ticker", sort=True):
+        group = group.sort_values("Date").copy()
+        group["DailyChange"] = group["Close"] - group["Open"]
+        group["DailyChangePercent"] = (group["Close"] / group["Open"] - 1) * 100
+        group["DollarVolume"] = group["Volume"] * group["Close"]
+        group["MA10"] = group["Close"].rolling(window=10, min_periods=1).mean()
+        group["MA30"] = group["Close"].rolling(window=30, min_periods=1).mean()
+        returns = group["Close"].pct_change().fillna(0)
+        group["Volatility20D"] = returns.rolling(window=20, min_periods=1).std() * (252 ** 0.5)
+        delta = group["Close"].diff().fillna(0)
+        up_mean = delta.clip(lower=0).rolling(window=14, min_periods=1).mean()
+        down_mean = (-1 * delta.clip(upper=0)).rolling(window=14, min_periods=1).mean()
+        down_mean = down_mean.replace(0, np.finfo(float).eps)
+        group["RSI"] = 100 - (100 / (1 + up_mean / down_mean))
+        frames.append(group)
+    return pd.concat(frames, ignore_index=True)
+
+
+def synthetic_prices(ticker_count, days, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2020-01-01", periods=days)
+    frames = []
+    for i in range(ticker_count):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+        frames.append(pd.DataFrame({
+            "Ticker": f"T{i:03d}",
+            "Date": dates,
+            "Open": close * (1 + rng.normal(0, 0.005, days)),
+            "High": close * 1.01,
+            "Low": close * 0.99,
+            "Close": close,
+            "Volume": rng.integers(1_000_000, 50_000_000, days),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def best_of(func, repeats=3):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=1260, help="Trading days per ticker (default: 5 years)")
+    parser.add_argument("--tickers", type=int, nargs="+", default=[1, 5, 10, 25, 50])
+    args = parser.parse_args()
+
+    print(f"{'tickers':>8} {'rows':>8} {'legacy (ms)':>12} {'engine (ms)':>12} {'speedup':>8}")
+    for ticker_count in args.tickers:
+        df = synthetic_prices(ticker_count, args.days)
+        legacy_time, expected = best_of(lambda: legacy_indicators(df))
+        engine_time, actual = best_of(lambda: compute_indicators(df))
+        np.testing.assert_allclose(
+            actual[INDICATOR_COLUMNS].to_numpy(), expected[INDICATOR_COLUMNS].to_numpy(), rtol=1e-7, atol=1e-9
+        )
+        print(f"{ticker_count:>8} {len(df):>8} {legacy_time * 1000:>12.1f} {engine_time * 1000:>12.1f} "
+              f"{legacy_time / engine_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
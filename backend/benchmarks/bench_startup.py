@@ -0,0 +1,83 @@
+"""
+Benchmark backend start-up: the time to import main.py in a fresh interpreter.
+
+Usage:
+    python benchmarks/bench_startup.py [--module main] [--runs 5] [--baseline <git rev>]
+
+With --baseline, the same module is also imported from a temporary git worktree
+checked out at that revision (e.g. the commit before the Snowflake agent stopped
+running its sample workload on import), so before/after can be compared. The
+slowest top-level imports of the current tree are listed from -X importtime.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def import_times(backend_dir, module, runs):
+    """Wall-clock seconds to import module in a new interpreter, one value per run."""
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=backend_dir, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed in {backend_dir}:\n{result.stderr[-2000:]}")
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def slowest_imports(backend_dir, module, top=10):
+    """Top-level packages with the largest cumulative import time (microseconds)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=backend_dir, capture_output=True, text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)", line)
+        # Only packages imported directly, not their submodules
+        if match and len(match.group(2)) <= 1:
+            rows.append((int(match.group(1)), match.group(3)))
+    return sorted(rows, reverse=True)[:top]
+
+
+def report(label, timings):
+    print(f"{label:<12} median {statistics.median(timings):6.2f}s  "
+          f"min {min(timings):6.2f}s  max {max(timings):6.2f}s  ({len(timings)} runs)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="Module to import from backend/ (default: main)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--baseline", help="Git revision to compare against")
+    args = parser.parse_args()
+
+    if args.baseline:
+        with tempfile.TemporaryDirectory() as tmp:
+            worktree = os.path.join(tmp, "baseline")
+            subprocess.run(["git", "worktree", "add", "--detach", worktree, args.baseline],
+                           cwd=BACKEND_DIR, check=True, capture_output=True)
+            try:
+                report("baseline", import_times(os.path.join(worktree, "backend"), args.module, args.runs))
+            finally:
+                subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=BACKEND_DIR, check=False)
+
+    report("current", import_times(BACKEND_DIR, args.module, args.runs))
+
+    print(f"\nSlowest top-level imports of {args.module} (current tree):")
+    for cumulative_us, name in slowest_imports(BACKEND_DIR, args.module):
+        print(f"  {cumulative_us / 1e6:6.2f}s  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark the data-summary prompt: size of the previous dict-repr prompt vs the compact tabular one.
+
+Usage:
+    python benchmarks/bench_summary_prompt.py [--quarters 1 4 8 20] [--gemini]
+
+Synthetic NVIDIA_FIN_DATA-shaped results are used (63 trading days per quarter).
+Token counts are estimated as characters / 4; with --gemini and GEMINI_API_KEY
+set, Gemini's count_tokens is reported too.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agents.data_summary import build_summary_prompt, summary_statistics
+
+
+def legacy_prompt(query, agg_df, raw_df):
+    """The previous prompt: to_dict reprs and per-column statistics loops."""
+    agg_data = agg_df.to_dict(orient="records") if agg_df is not None else []
+    sample_data = raw_df.head(5).to_dict(orient="records") if raw_df is not None else []
+    stats = {}
+    if raw_df is not None:
+        numeric_cols = raw_df.select_dtypes(include=['float64', 'int64']).columns
+        for col in numeric_cols:
+            stats[col] = {
+                "min": raw_df[col].min(),
+                "max": raw_df[col].max(),
+                "avg": raw_df[col].mean(),
+                "median": raw_df[col].median()
+            }
+    return f"""
+    As a financial analyst, summarize the following NVIDIA data in response to this query:
+
+    QUERY: {query}
+
+    AGGREGATED DATA: {agg_data}
+
+    SAMPLE RAW DATA: {sample_data}
+
+    STATISTICS: {stats}
+
+    Provide a clear, concise summary focusing on key insights related to the query.
+    Include notable trends, patterns, or outliers in the data.
+    Use specific numbers from the data to support your analysis.
+    """
+
+
+def synthetic_results(quarters, seed=0):
+    rng = np.random.default_rng(seed)
+    days = quarters * 63
+    dates = pd.bdate_range("2020-01-01", periods=days)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+    raw_df = pd.DataFrame({
+        "DATE": dates,
+        "YEAR": dates.year,
+        "QUARTER": dates.quarter,
+        "CLOSE": close,
+        "HIGH": close * 1.01,
+        "LOW": close * 0.99,
+        "VOLUME": rng.integers(100_000_000, 600_000_000, days),
+        "DOLLARVOLUME": close * rng.integers(100_000_000, 600_000_000, days),
+        "RSI": rng.uniform(20, 80, days),
+        "MA10": close,
+    })
+    agg_df = raw_df.groupby(["YEAR", "QUARTER"], as_index=False).agg(
+        TOTAL_DOLLARVOLUME=("DOLLARVOLUME", "sum"), AVG_RSI=("RSI", "mean"), AVG_CLOSE=("CLOSE", "mean")
+    )
+    return agg_df, raw_df
+
+
+def legacy_statistics(raw_df):
+    return {
+        col: {"min": raw_df[col].min(), "max": raw_df[col].max(), "avg": raw_df[col].mean(), "median": raw_df[col].median()}
+        for col in raw_df.select_dtypes(include=['float64', 'int64']).columns
+    }
+
+
+def timed(func, repeats=20):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quarters", type=int, nargs="+", default=[1, 4, 8, 20])
+    parser.add_argument("--gemini", action="store_true", help="Also count tokens with the Gemini API")
+    args = parser.parse_args()
+
+    count_tokens = lambda text: len(text) // 4
+    gemini_model = None
+    if args.gemini and os.getenv("GEMINI_API_KEY"):
+        import google.generativeai as genai
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        gemini_model = genai.GenerativeModel("gemini-1.5-pro")
+
+    query = "How did NVIDIA's dollar volume and RSI develop over the selected quarters?"
+    header = f"{'quarters':>8} {'rows':>6} | {'chars old':>9} {'chars new':>9} | {'~tok old':>8} {'~tok new':>8} {'saved':>6} | {'stats old':>9} {'stats new':>9}"
+    print(header + (" | gemini old  gemini new" if gemini_model else ""))
+    for quarters in args.quarters:
+        agg_df, raw_df = synthetic_results(quarters)
+        old, new = legacy_prompt(query, agg_df, raw_df), build_summary_prompt(query, agg_df, raw_df)
+        old_tokens, new_tokens = count_tokens(old), count_tokens(new)
+        line = (f"{quarters:>8} {len(raw_df):>6} | {len(old):>9} {len(new):>9} | "
+                f"{old_tokens:>8} {new_tokens:>8} {1 - new_tokens / old_tokens:>6.0%} | "
+                f"{timed(lambda: legacy_statistics(raw_df)):>7.2f}ms {timed(lambda: summary_statistics(raw_df)):>7.2f}ms")
+        if gemini_model:
+            line += (f" | {gemini_model.count_tokens(old).total_tokens:>10} "
+                     f"{gemini_model.count_tokens(new).total_tokens:>10}")
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
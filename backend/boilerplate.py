@@ -0,0 +1,133 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import Counter
+
+BOILERPLATE_REGISTRY_PATH = os.getenv("BOILERPLATE_REGISTRY_PATH", "data/boilerplate_registry.json")
+
+# Paragraphs shorter than this are never treated as shared boilerplate
+MIN_SHARED_WORDS = 30
+
+# Short lines repeated at least this often in one filing are page headers/footers
+MIN_FURNITURE_REPEATS = 3
+MAX_FURNITURE_WORDS = 12
+
+_PAGE_MARKER = re.compile(r"^(page\s+)?\d{1,3}(\s+of\s+\d{1,3})?$|^table of contents$", re.IGNORECASE)
+
+
+def strip_page_furniture(markdown_text):
+    """
+    Removes page headers, footers and page numbers from a converted filing.
+    These are short non-header, non-table lines that repeat across pages.
+    """
+    lines = markdown_text.splitlines()
+    counts = Counter(line.strip() for line in lines)
+
+    def is_furniture(line):
+        stripped = line.strip()
+        if not stripped or stripped.startswith(("#", "|")):
+            return False
+        if _PAGE_MARKER.match(stripped):
+            return True
+        return counts[stripped] >= MIN_FURNITURE_REPEATS and len(stripped.split()) <= MAX_FURNITURE_WORDS
+
+    return "\n".join(line for line in lines if not is_furniture(line))
+
+
+def _paragraphs(markdown_text):
+    return [paragraph.strip() for paragraph in re.split(r"\n\s*\n", markdown_text) if paragraph.strip()]
+
+
+def paragraph_hash(paragraph):
+    """Hashes a paragraph ignoring case and whitespace differences."""
+    normalized = " ".join(paragraph.lower().split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def _is_candidate(paragraph):
+    return not paragraph.startswith(("#", "|")) and len(paragraph.split()) >= MIN_SHARED_WORDS
+
+
+class BoilerplateRegistry:
+    """
+    Corpus-wide record of which paragraphs appear in which filings.
+
+    A paragraph seen in two or more filings is shared boilerplate: it is removed
+    from each filing's text and indexed once, with the list of periods it appears in.
+    The registry is persisted so shared blocks are recognised across pipeline runs.
+    """
+
+    def __init__(self, path=BOILERPLATE_REGISTRY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.paragraphs = {}  # hash -> {"periods": {filename: period}, "text": str (once shared)}
+        self.filings = {}     # filename -> {"hashes": [...], "stripped": [...]}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.paragraphs = data.get("paragraphs", {})
+            self.filings = data.get("filings", {})
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"paragraphs": self.paragraphs, "filings": self.filings}, f)
+        os.replace(tmp_path, self.path)
+
+    def register(self, filename, period, markdown_text):
+        """Records the candidate paragraphs of a filing under its period (e.g. '2024_1')."""
+        with self._lock:
+            hashes = []
+            for paragraph in _paragraphs(strip_page_furniture(markdown_text)):
+                if not _is_candidate(paragraph):
+                    continue
+                key = paragraph_hash(paragraph)
+                entry = self.paragraphs.setdefault(key, {"periods": {}})
+                entry["periods"][filename] = period
+                if len(entry["periods"]) > 1 and "text" not in entry:
+                    entry["text"] = paragraph
+                hashes.append(key)
+            previous = self.filings.get(filename, {})
+            self.filings[filename] = {"hashes": sorted(set(hashes)), "stripped": previous.get("stripped", [])}
+            self._save()
+
+    def _is_shared(self, key):
+        return len(self.paragraphs.get(key, {}).get("periods", {})) > 1
+
+    def normalize(self, filename, markdown_text):
+        """
+        Returns the filing text with page furniture and shared paragraphs removed,
+        and records which shared paragraphs were stripped.
+        """
+        with self._lock:
+            kept, stripped = [], set()
+            for paragraph in _paragraphs(strip_page_furniture(markdown_text)):
+                key = paragraph_hash(paragraph) if _is_candidate(paragraph) else None
+                if key and self._is_shared(key):
+                    stripped.add(key)
+                else:
+                    kept.append(paragraph)
+            if filename in self.filings:
+                self.filings[filename]["stripped"] = sorted(stripped)
+                self._save()
+            return "\n\n".join(kept)
+
+    def shared_blocks(self):
+        """Returns the shared paragraphs as [{"hash", "text", "periods": [...]}]."""
+        with self._lock:
+            return [
+                {"hash": key, "text": entry["text"], "periods": sorted(set(entry["periods"].values()))}
+                for key, entry in self.paragraphs.items()
+                if len(entry["periods"]) > 1 and "text" in entry
+            ]
+
+    def stale_filings(self):
+        """Filings whose text contains paragraphs that became shared after they were normalized."""
+        with self._lock:
+            return [
+                filename for filename, filing in self.filings.items()
+                if {key for key in filing["hashes"] if self._is_shared(key)} != set(filing["stripped"])
+            ]
@@ -0,0 +1,165 @@
+import os
+import re
+import json
+import fcntl
+import hashlib
+import logging
+import threading
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "data/embedding_cache")
+
+DEFAULT_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+_MODELS = {}
+_MODELS_LOCK = threading.Lock()
+
+
+def get_sentence_model(model_name=DEFAULT_MODEL_NAME):
+    """Returns the process-wide SentenceTransformer for model_name, loading it once."""
+    with _MODELS_LOCK:
+        if model_name not in _MODELS:
+            from sentence_transformers import SentenceTransformer
+            _MODELS[model_name] = SentenceTransformer(model_name)
+        return _MODELS[model_name]
+
+
+def model_fingerprint(model):
+    """
+    Short hash identifying what a SentenceTransformer computes: the checkpoint
+    revision and config of its transformer, the config of every other module
+    (pooling, normalization) and the sequence length it truncates to.
+    """
+    parts = [str(model.max_seq_length)]
+    for module in model:
+        parts.append(type(module).__name__)
+        auto_model = getattr(module, "auto_model", None)
+        if auto_model is not None:
+            config = auto_model.config.to_dict()
+            config.pop("transformers_version", None)
+            parts.append(getattr(auto_model.config, "_commit_hash", None) or "")
+            parts.append(json.dumps(config, sort_keys=True, default=str))
+        elif hasattr(module, "get_config_dict"):
+            parts.append(json.dumps(module.get_config_dict(), sort_keys=True, default=str))
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def text_hash(text):
+    """Returns the cache key for a chunk of text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent on-disk cache of embeddings keyed by hash(chunk text).
+
+    Each model name and revision (see model_fingerprint) gets its own directory,
+    so changing the model never returns stale vectors. Vectors are appended in
+    immutable segments: a memory-mapped .npy array plus a .json list of the text
+    hashes of its rows. Writers hold an exclusive lock on the directory, so several
+    ingestion processes can share it.
+    """
+
+    def __init__(self, model_name, model_revision, dimension, cache_dir=DEFAULT_CACHE_DIR, dtype=np.float16):
+        self.dimension = dimension
+        self.dtype = np.dtype(dtype)
+        model_key = f"{model_name}@{model_revision}"
+        self.directory = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.@-]+", "_", model_key))
+        os.makedirs(self.directory, exist_ok=True)
+
+        # text hash -> (segment number, row)
+        self._locations = {}
+        self._segments = {}
+        self._next_segment = 0
+        self._load_new_segments()
+        logging.info(f"Embedding cache loaded {len(self._locations)} vectors from {self.directory}")
+
+    def _load_new_segments(self):
+        """Indexes segments written since the last scan, by this or another process."""
+        for keys_file in sorted(f for f in os.listdir(self.directory) if f.endswith(".json")):
+            segment = int(keys_file.split("_")[1].split(".")[0])
+            if segment < self._next_segment:
+                continue
+            with open(os.path.join(self.directory, keys_file), "r", encoding="utf-8") as f:
+                for row, key in enumerate(json.load(f)):
+                    self._locations[key] = (segment, row)
+            self._next_segment = segment + 1
+
+    def __len__(self):
+        return len(self._locations)
+
+    def _segment_path(self, segment, extension):
+        return os.path.join(self.directory, f"segment_{segment:05d}.{extension}")
+
+    def _segment(self, segment):
+        """Memory-maps a segment's vectors on first access."""
+        if segment not in self._segments:
+            self._segments[segment] = np.load(self._segment_path(segment, "npy"), mmap_mode="r")
+        return self._segments[segment]
+
+    def get_many(self, texts):
+        """
+        Looks up cached vectors for texts.
+
+        Returns:
+            (vectors, missing): a float32 array of shape (len(texts), dimension) with cached
+            rows filled in, and the list of indexes into texts that were not cached.
+        """
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        missing = []
+        for i, text in enumerate(texts):
+            location = self._locations.get(text_hash(text))
+            if location is None:
+                missing.append(i)
+            else:
+                segment, row = location
+                vectors[i] = self._segment(segment)[row]
+        return vectors, missing
+
+    def put_many(self, texts, vectors):
+        """Appends vectors for texts as a new segment, skipping texts already cached."""
+        with open(os.path.join(self.directory, "write.lock"), "a") as lock:
+            # Other processes may have added segments; number ours after theirs
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._load_new_segments()
+
+            rows, keys, seen = [], [], set()
+            for text, vector in zip(texts, vectors):
+                key = text_hash(text)
+                if key not in self._locations and key not in seen:
+                    seen.add(key)
+                    keys.append(key)
+                    rows.append(vector)
+            if not keys:
+                return
+
+            segment = self._next_segment
+            np.save(self._segment_path(segment, "npy"), np.asarray(rows, dtype=self.dtype))
+            # Write the keys last so a crash never leaves keys pointing at missing vectors
+            tmp_path = self._segment_path(segment, "json.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(keys, f)
+            os.replace(tmp_path, self._segment_path(segment, "json"))
+
+            for row, key in enumerate(keys):
+                self._locations[key] = (segment, row)
+            self._next_segment += 1
+
+    def encode(self, model, texts, **encode_kwargs):
+        """Encodes texts with model, only running the model on texts not already cached."""
+        vectors, missing = self.get_many(texts)
+        encoded_count = 0
+        if missing:
+            # Repeated texts are encoded once and the vector copied to every occurrence
+            positions, missing_texts = {}, []
+            for i in missing:
+                key = text_hash(texts[i])
+                if key not in positions:
+                    positions[key] = len(missing_texts)
+                    missing_texts.append(texts[i])
+            encoded = np.asarray(model.encode(missing_texts, **encode_kwargs), dtype=np.float32)
+            vectors[missing] = encoded[[positions[text_hash(texts[i])] for i in missing]]
+            self.put_many(missing_texts, encoded)
+            encoded_count = len(missing_texts)
+        logging.info(f"Embedding cache: {len(texts) - len(missing)} hits, {encoded_count} encoded")
+        return vectors
@@ -0,0 +1,288 @@
+import os
+import re
+import time
+import threading
+import pandas as pd
+
+FACT_STORE_PATH = os.getenv("FACT_STORE_PATH", "data/financial_facts.parquet")
+
+# The ingestion job publishes the store here; backend workers pull it like the replica
+FACT_STORE_S3_KEY = "facts/financial_facts.parquet"
+
+# How often (seconds) the backend checks S3 for a newer fact store
+FACT_STORE_CHECK_INTERVAL = int(os.getenv("FACT_STORE_CHECK_INTERVAL", "300"))
+
+FACT_COLUMNS = ["year", "quarter", "filename", "statement", "line_item", "column_label", "column", "value", "unit"]
+
+# Keywords in the text preceding a table that identify which statement it belongs to
+STATEMENT_KEYWORDS = [
+    ("income_statement", ("statements of income", "statement of income", "statements of operations", "income statement")),
+    ("comprehensive_income", ("comprehensive income",)),
+    ("balance_sheet", ("balance sheet",)),
+    ("cash_flow", ("cash flows", "cash flow")),
+    ("shareholders_equity", ("shareholders' equity", "shareholders’ equity", "stockholders' equity")),
+    ("segment", ("segment",)),
+]
+
+# Narrative questions go to the LLM even if they mention a line item
+NARRATIVE_TERMS = ("why", "explain", "describe", "reason", "driver", "strategy", "risk", "outlook", "impact", "discuss")
+
+# Phrasings of a plain lookup or comparison; only these are answered from the fact store alone
+_LOOKUP_QUESTION = re.compile(
+    r"^\s*(?:what\s+(?:was|were|is|are)|how\s+(?:much|many)|list|show|give)\b"
+    r"|\b(?:compare|comparison|versus|vs\.?|difference\s+between|higher|lower|more\s+than|less\s+than)\b",
+    re.IGNORECASE
+)
+
+_NUMBER = re.compile(r"^\(?-?\$?\s*\(?([\d,]+(?:\.\d+)?)\)?\s*%?\)?$")
+_DASH = {"—", "-", "–", "--"}
+
+
+def parse_value(cell):
+    """Parses a financial table cell: '$ 1,234' -> 1234.0, '(56)' -> -56.0, '—' -> 0.0, text -> None."""
+    text = cell.strip().replace("$", "").strip()
+    if text in _DASH:
+        return 0.0
+    match = _NUMBER.match(text)
+    if not match:
+        return None
+    value = float(match.group(1).replace(",", ""))
+    return -value if text.startswith("(") or text.startswith("-") else value
+
+
+def normalize_line_item(text):
+    """Normalizes a line item for matching: lowercase words only."""
+    return " ".join(re.findall(r"[a-z]+", text.lower()))
+
+
+def _classify_statement(context):
+    context = context.lower()
+    for statement, keywords in STATEMENT_KEYWORDS:
+        if any(keyword in context for keyword in keywords):
+            return statement
+    return "other"
+
+
+def _detect_unit(context):
+    context = context.lower()
+    if "in millions" in context:
+        return "USD millions"
+    if "in thousands" in context:
+        return "USD thousands"
+    return "USD"
+
+
+def _split_row(line):
+    return [cell.strip() for cell in line.strip().strip("|").split("|")]
+
+
+def _is_separator(cells):
+    return all(set(cell) <= set("-: ") for cell in cells)
+
+
+def parse_markdown_tables(markdown_text):
+    """
+    Extracts facts from the markdown tables of a converted filing.
+
+    The statement and unit are taken from the headings/text just above each table.
+    The first column is the line item; every other numeric cell becomes one fact,
+    labelled with its column header ("$" and empty cells from OCR are dropped first).
+
+    Returns:
+        List[Dict]: facts with statement, line_item, column_label, column, value and unit.
+    """
+    facts = []
+    context_lines = []
+    table = []
+
+    def flush_table():
+        if not table:
+            return
+        context = " ".join(context_lines[-6:])
+        statement = _classify_statement(context)
+        unit = _detect_unit(context)
+
+        rows = [_split_row(line) for line in table]
+        header_rows = []
+        for cells in rows:
+            if _is_separator(cells):
+                continue
+            values = [cell for cell in cells[1:] if cell and cell != "$"]
+            numbers = [parse_value(cell) for cell in values]
+            line_item = cells[0]
+            if not line_item or not values or any(number is None for number in numbers):
+                # Header rows label the value columns
+                if any(values):
+                    header_rows.append(values)
+                continue
+            labels = header_rows[-1] if header_rows and len(header_rows[-1]) == len(numbers) else []
+            row_unit = "USD per share" if "per share" in line_item.lower() else unit
+            if any("%" in value for value in values):
+                row_unit = "percent"
+            for column, number in enumerate(numbers):
+                facts.append({
+                    "statement": statement,
+                    "line_item": line_item,
+                    "column_label": labels[column] if labels else "",
+                    "column": column,
+                    "value": number,
+                    "unit": row_unit
+                })
+        table.clear()
+
+    for line in markdown_text.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("|"):
+            table.append(stripped)
+            continue
+        flush_table()
+        if stripped:
+            context_lines.append(stripped.lstrip("#").strip())
+    flush_table()
+    return facts
+
+
+class FactStore:
+    """
+    Columnar store of financial table facts backed by a Parquet file.
+    One row per (filing, statement, line item, column) with year and quarter.
+    """
+
+    _cache = {}
+    _lock = threading.Lock()
+
+    _last_check = {}
+
+    def __init__(self, path=FACT_STORE_PATH, s3_key=FACT_STORE_S3_KEY):
+        self.path = path
+        self.s3_key = s3_key
+
+    def _sync_from_s3(self):
+        """Downloads the store from S3 when missing locally or older than the S3 copy."""
+        now = time.monotonic()
+        if not self.s3_key or (os.path.exists(self.path)
+                               and now - FactStore._last_check.get(self.path, 0) < FACT_STORE_CHECK_INTERVAL):
+            return
+        FactStore._last_check[self.path] = now
+        try:
+            from s3_utils import get_s3_client
+            s3_client = get_s3_client()
+            bucket_name = os.getenv('AWS_S3_BUCKET_NAME')
+            head = s3_client.head_object(Bucket=bucket_name, Key=self.s3_key)
+            if os.path.exists(self.path) and os.path.getmtime(self.path) >= head["LastModified"].timestamp():
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            s3_client.download_file(bucket_name, self.s3_key, f"{self.path}.tmp")
+            os.replace(f"{self.path}.tmp", self.path)
+            print("Downloaded financial fact store from S3")
+        except Exception as e:
+            print(f"Could not sync financial fact store from S3: {e}")
+
+    def load(self):
+        """Returns the facts DataFrame (synced from S3), cached in memory until the file changes."""
+        with FactStore._lock:
+            self._sync_from_s3()
+        if not os.path.exists(self.path):
+            return pd.DataFrame(columns=FACT_COLUMNS)
+        mtime = os.path.getmtime(self.path)
+        with FactStore._lock:
+            cached = FactStore._cache.get(self.path)
+            if cached is None or cached[0] != mtime:
+                df = pd.read_parquet(self.path)
+                df["line_item_key"] = df["line_item"].map(normalize_line_item)
+                FactStore._cache[self.path] = (mtime, df)
+            return FactStore._cache[self.path][1]
+
+    def replace_filing(self, filename, year, quarter, facts):
+        """Replaces all facts for one filing."""
+        new_df = pd.DataFrame(facts, columns=[c for c in FACT_COLUMNS if c not in ("year", "quarter", "filename")])
+        new_df.insert(0, "filename", filename)
+        new_df.insert(0, "quarter", str(quarter))
+        new_df.insert(0, "year", str(year))
+
+        existing = self.load()
+        existing = existing[existing["filename"] != filename][FACT_COLUMNS] if not existing.empty else existing
+        df = pd.concat([existing, new_df[FACT_COLUMNS]], ignore_index=True) if not existing.empty else new_df[FACT_COLUMNS]
+        df["value"] = df["value"].astype("float64")
+        df["column"] = df["column"].astype("int16")
+        for column in ("year", "quarter", "filename", "statement", "unit"):
+            df[column] = df[column].astype("category")
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, self.path)
+
+        # Publish for the backend workers, which answer questions from the S3 copy
+        if self.s3_key:
+            from s3_utils import upload_to_s3
+            with open(self.path, "rb") as f:
+                upload_to_s3(self.s3_key, f.read())
+
+    def lookup(self, line_item_keys, year_quarter_dict):
+        """
+        Returns current-period values (the first value column of each table) for the
+        given normalized line items and periods, as a DataFrame sorted by period.
+        """
+        df = self.load()
+        if df.empty:
+            return df
+        periods = {(str(year), str(q)) for year, quarters in year_quarter_dict.items() for q in quarters}
+        mask = df["line_item_key"].isin(line_item_keys) & (df["column"] == 0)
+        mask &= pd.Series([(y, q) in periods for y, q in zip(df["year"], df["quarter"])], index=df.index)
+        result = df[mask].drop_duplicates(subset=["year", "quarter", "statement", "line_item_key"])
+        return result.sort_values(["line_item_key", "year", "quarter"])
+
+    def match_line_items(self, query):
+        """Finds the known line items mentioned in a question, preferring the longest names."""
+        df = self.load()
+        if df.empty:
+            return []
+        normalized_query = f" {normalize_line_item(query)} "
+        keys = sorted({key for key in df["line_item_key"].unique() if key and len(key) > 3}, key=len, reverse=True)
+        matched = []
+        for key in keys:
+            if f" {key} " in normalized_query and not any(key in longer for longer in matched):
+                matched.append(key)
+        return matched
+
+
+def extract_filing_facts(fact_store, filename, year, quarter, markdown_text):
+    """Parses a filing's tables and stores its facts, returning the number of facts."""
+    facts = parse_markdown_tables(markdown_text)
+    fact_store.replace_filing(filename, year, quarter, facts)
+    return len(facts)
+
+
+def is_lookup_question(query):
+    """True for plain lookups/comparisons of figures ("What was revenue in Q2?"), not narrative questions."""
+    if any(term in query.lower() for term in NARRATIVE_TERMS):
+        return False
+    return bool(_LOOKUP_QUESTION.search(query))
+
+
+def reported_figures(query, year_quarter_dict, fact_store=None):
+    """
+    The reported values of the line items a question mentions, for the selected
+    periods, formatted as markdown. Returns None when there are no matching facts.
+    """
+    fact_store = fact_store or FactStore()
+    line_item_keys = fact_store.match_line_items(query)
+    if not line_item_keys:
+        return None
+    facts = fact_store.lookup(line_item_keys, year_quarter_dict)
+    if facts.empty:
+        return None
+
+    lines = ["Reported figures from NVIDIA's quarterly filings:", ""]
+    for (line_item_key, statement), group in facts.groupby(["line_item_key", "statement"], observed=True, sort=False):
+        lines.append(f"**{group['line_item'].iloc[0]}** ({statement.replace('_', ' ')}, {group['unit'].iloc[0]})")
+        previous = None
+        for _, row in group.iterrows():
+            change = ""
+            if previous not in (None, 0):
+                change = f" ({(row['value'] - previous) / abs(previous):+.1%} vs previous period)"
+            lines.append(f"- {row['year']} Q{row['quarter']}: {row['value']:,.2f}{change}")
+            previous = row["value"]
+        lines.append("")
+    return "\n".join(lines).strip()
@@ -118,7 +118,8 @@ def run_oracle(state):
         tool=chosen_tool,
         tool_input={
             "query": state["input"],
-            "metadata_filters": state.get("metadata_filters", {})
+            "metadata_filters": state.get("metadata_filters", {}),
+            "chart_format": state.get("chart_format", "png")
         },
         log=f"Selected {chosen_tool} based on mode: {state.get('mode')}"
     )
@@ -484,12 +485,14 @@ def snowflake_search(state):
     # Extract the query and metadata filters from the tool input
     query = tool_input.get("query", "")
     metadata_filters = tool_input.get("metadata_filters", {})
+    chart_format = tool_input.get("chart_format", "png")
+    charts = []
     
     print(f"Searching Snowflake with query={query}, filters={metadata_filters}")
     
     try:
         # Call the Snowflake insights function
-        result = generate_snowflake_insights(query, metadata_filters)
+        result = generate_snowflake_insights(query, metadata_filters, chart_format)
         print(f"Result: {result}")
         # Format the response for LangGraph with proper markdown
         formatted_result = {
@@ -504,9 +507,12 @@ def snowflake_search(state):
         
         # Convert to markdown string with proper image syntax
         markdown_result = formatted_result["text"]
-        if result['visualizations']:
+        # Vega-Lite charts travel next to the answer and are rendered by the client
+        charts = [viz for viz in result['visualizations'] if "spec" in viz]
+        image_visualizations = [viz for viz in result['visualizations'] if "url" in viz]
+        if image_visualizations:
             markdown_result += "\n## Visualizations\n\n"
-            for viz in result['visualizations']:
+            for viz in image_visualizations:
                 image_markdown = f"![{viz['title']}]({viz['url']})\n\n"
                 caption_markdown = f"*{viz['title']} - {', '.join(viz['columns'])}*\n\n"
                 markdown_result += image_markdown + caption_markdown
@@ -536,4 +542,7 @@ def snowflake_search(state):
             log=f"Error searching Snowflake: {str(e)}"
         )
     
-    return {"intermediate_steps": state["intermediate_steps"] + [new_action]}
+    return {
+        "intermediate_steps": state["intermediate_steps"] + [new_action],
+        "charts": (state.get("charts") or []) + charts
+    }
@@ -1,5 +1,6 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
@@ -7,6 +8,9 @@ import time
 from typing import Dict, List
 from pinecone_db import AgenticResearchAssistant
 from research_graph import initialize_research_graph, run_research_graph
+from agents.snowflake_pool import get_snowflake_pool
+from agents.chart_renderer import shutdown_render_pool
+from agents.chart_specs import CHART_FORMATS
 
 # Define lifespan context manager
 @asynccontextmanager
@@ -23,6 +27,8 @@ async def lifespan(app: FastAPI):
     
     # Cleanup (if needed)
     print("Shutting down research graph...")
+    get_snowflake_pool().close_all()
+    shutdown_render_pool()
 
 # Initialize FastAPI with lifespan
 app = FastAPI(lifespan=lifespan)
@@ -36,6 +42,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON responses (Vega-Lite chart data shrinks several-fold)
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 class QuestionRequest(BaseModel):
     question: str
     vector_db: str
@@ -61,6 +70,7 @@ class ResearchRequest(BaseModel):
     query: str
     year_quarter_dict: Dict[str, List[str]]
     mode: str = "combined"  # "pinecone", "web_search", or "combined"
+    chart_format: str = "png"  # "png" (image URLs in result) or "vega_lite" (specs in charts)
 
 # API Endpoints
 @app.get("/")
@@ -111,6 +121,8 @@ async def research_endpoint(request: ResearchRequest):
         valid_modes = ["pinecone", "web_search", "snowflake", "combined"]
         if request.mode not in valid_modes:
             return {"error": f"Invalid mode '{request.mode}'. Must be one of: {', '.join(valid_modes)}"}
+        if request.chart_format not in CHART_FORMATS:
+            return {"error": f"Invalid chart_format '{request.chart_format}'. Must be one of: {', '.join(CHART_FORMATS)}"}
         
         # Validate year_quarter_dict for pinecone, snowflake, and combined modes
         if request.mode in ["pinecone", "snowflake", "combined"] and (not request.year_quarter_dict or not any(request.year_quarter_dict.values())):
@@ -118,10 +130,11 @@ async def research_endpoint(request: ResearchRequest):
         
         try:
             # Run the research workflow
-            result = run_research_graph(
+            result, charts = run_research_graph(
                 query=request.query,
                 year_quarter_dict=request.year_quarter_dict,
-                mode=request.mode
+                mode=request.mode,
+                chart_format=request.chart_format
             )
             
             # Format the response
@@ -129,6 +142,7 @@ async def research_endpoint(request: ResearchRequest):
             
             return {
                 "result": result,
+                "charts": charts,
                 "processing_time": processing_time,
                 "mode": request.mode
             }
@@ -1,89 +1,244 @@
 import re
 import json
 
-def chunk_markdown_by_headers(markdown_text, ideal_word_count=500):
+# Regex to match markdown headers at the beginning of a line.
+HEADER_PATTERN = re.compile(r'^(#{1,6})\s*(.+)$', re.MULTILINE)
+
+# Default tokenizer used for token budgets; matches the embedding model in pinecone_db.
+DEFAULT_TOKENIZER_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+_default_counter = None
+
+
+def get_token_counter(tokenizer=None):
+    """
+    Returns a callable that counts tokens in a piece of text.
+
+    If a Hugging Face tokenizer is passed (e.g. SentenceTransformer(...).tokenizer),
+    it is used directly. Otherwise the MiniLM tokenizer is loaded lazily once; if
+    transformers is not available, whitespace word count is used as an approximation.
+    """
+    global _default_counter
+
+    if tokenizer is not None:
+        return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+
+    if _default_counter is None:
+        try:
+            from transformers import AutoTokenizer
+            default_tokenizer = AutoTokenizer.from_pretrained(DEFAULT_TOKENIZER_NAME)
+            _default_counter = lambda text: len(default_tokenizer.encode(text, add_special_tokens=False))
+        except Exception as e:
+            print(f"Tokenizer unavailable ({e}), falling back to word counts")
+            _default_counter = lambda text: len(text.split())
+    return _default_counter
+
+
+def _iter_sections(markdown_text):
+    """Yields (header_line, header_level, body_text) for each header section, lazily."""
+    previous = None
+    for match in HEADER_PATTERN.finditer(markdown_text):
+        if previous is None:
+            # Text before the first header becomes its own header-less section.
+            preamble = markdown_text[:match.start()].strip()
+            if preamble:
+                yield None, None, preamble
+        else:
+            yield previous.group(0).strip(), len(previous.group(1)), markdown_text[previous.end():match.start()].strip()
+        previous = match
+
+    if previous is None:
+        yield None, None, markdown_text.strip()
+    else:
+        yield previous.group(0).strip(), len(previous.group(1)), markdown_text[previous.end():].strip()
+
+
+def _iter_blocks(body_text):
+    """
+    Yields the paragraph and table blocks of a section body.
+    Tables are runs of consecutive lines starting with '|'; paragraphs are separated by blank lines.
+    """
+    block = []
+    in_table = False
+    for line in body_text.splitlines():
+        stripped = line.strip()
+        is_table_line = stripped.startswith("|")
+        if not stripped or (block and is_table_line != in_table):
+            if block:
+                yield "\n".join(block), in_table
+            block = []
+        if stripped:
+            block.append(line.rstrip())
+            in_table = is_table_line
+    if block:
+        yield "\n".join(block), in_table
+
+
+def _split_oversized_block(block, is_table, budget, count_tokens, overlap_tokens=0):
+    """
+    Splits a single block that does not fit in the token budget.
+    Tables are split on row boundaries with the column header rows repeated;
+    paragraphs are split on word boundaries with overlap_tokens of trailing words repeated.
+    """
+    if is_table:
+        rows = block.splitlines()
+        # Keep the header row and the |---| separator with every piece of the table.
+        table_header = rows[:2] if len(rows) > 2 and set(rows[1].replace("|", "").strip()) <= set("-: ") else rows[:1]
+        header_tokens = count_tokens("\n".join(table_header))
+        piece, piece_tokens = [], header_tokens
+        for row in rows[len(table_header):]:
+            row_tokens = count_tokens(row)
+            if piece and piece_tokens + row_tokens > budget:
+                yield "\n".join(table_header + piece)
+                piece, piece_tokens = [], header_tokens
+            piece.append(row)
+            piece_tokens += row_tokens
+        if piece:
+            yield "\n".join(table_header + piece)
+        return
+
+    piece = []
+    piece_tokens = 0
+    for word in block.split():
+        word_tokens = count_tokens(word)
+        if piece and piece_tokens + word_tokens > budget:
+            yield " ".join(word for word, _ in piece)
+            # Start the next piece with the trailing words of this one.
+            carried, carried_tokens = [], 0
+            for prev_word, prev_tokens in reversed(piece[1:]):
+                if carried_tokens + prev_tokens > overlap_tokens:
+                    break
+                carried.insert(0, (prev_word, prev_tokens))
+                carried_tokens += prev_tokens
+            piece, piece_tokens = carried, carried_tokens
+        piece.append((word, word_tokens))
+        piece_tokens += word_tokens
+    if piece:
+        yield " ".join(word for word, _ in piece)
+
+
+def _block_tail(block, max_tokens, count_tokens):
     """
-    Splits the markdown content into chunks based on headers.
-    If a chunk's word count is greater than 1.5 * ideal_word_count,
-    splits that chunk into two parts with the same header.
-    
+    The end of a block that fits in max_tokens, never the whole block: trailing rows
+    of a table, trailing words of a paragraph. Returns None if nothing fits.
+    """
+    is_table = block.lstrip().startswith("|")
+    parts = block.splitlines() if is_table else block.split()
+    tail, tail_tokens = [], 0
+    for part in reversed(parts[1:]):
+        part_tokens = count_tokens(part)
+        if tail_tokens + part_tokens > max_tokens:
+            break
+        tail.insert(0, part)
+        tail_tokens += part_tokens
+    if not tail:
+        return None
+    return ("\n" if is_table else " ").join(tail)
+
+
+def iter_markdown_chunks(markdown_text, max_tokens=256, overlap_tokens=32, tokenizer=None):
+    """
+    Lazily splits markdown content into token-bounded chunks based on headers.
+
+    Each header section is packed into as many windows as needed so that
+    header + content fits in max_tokens. Windows are built from whole paragraphs
+    and tables (oversized ones are split on row/word boundaries), and each new
+    window starts with up to overlap_tokens of trailing context from the previous
+    one: whole trailing blocks that fit, then the trailing words (or table rows)
+    of the block before them. The header line is prepended to every window as context.
+
     Each chunk is represented as a dictionary containing:
         - 'header': The header line (if available)
         - 'level': The header level (number of '#' characters)
-        - 'content': The text content for that chunk
-        - 'part' (optional): For split chunks, indicates part 1 or 2.
-    
+        - 'content': The text content for that chunk, starting with the header
+        - 'part' (optional): For split sections, the 1-based window number.
+
     Parameters:
         markdown_text (str): The full markdown text to be chunked.
-        ideal_word_count (int): Ideal word count for a chunk (default is 500).
-    
-    Returns:
-        List[Dict]: A list of chunk dictionaries with header metadata.
+        max_tokens (int): Token budget per chunk (default 256, the MiniLM window).
+        overlap_tokens (int): Tokens of trailing context repeated in the next window.
+        tokenizer: Optional Hugging Face tokenizer used to count tokens.
+
+    Yields:
+        Dict: Chunk dictionaries with header metadata.
     """
-    # Define the threshold to split: 1.5 * ideal_word_count
-    split_threshold = int(1.5 * ideal_word_count)
-    
-    # Regex to match markdown headers at the beginning of a line.
-    header_pattern = re.compile(r'^(#{1,6})\s*(.+)$', re.MULTILINE)
-    
-    # Find all header matches with their start positions.
-    matches = list(header_pattern.finditer(markdown_text))
-    chunks = []
-    
-    # If no header is found, treat the entire text as one chunk.
-    if not matches:
-        chunks.append({
-            'header': None,
-            'level': None,
-            'content': markdown_text.strip()
-        })
-        return chunks
-    
-    # Iterate through headers and split text between them.
-    for idx, match in enumerate(matches):
-        header_line = match.group(0).strip()  # full header line
-        header_level = len(match.group(1))      # number of '#' determines level
-        start_index = match.start()
-        end_index = matches[idx + 1].start() if idx + 1 < len(matches) else len(markdown_text)
-        chunk_text = markdown_text[start_index:end_index].strip()
-        
-        # Split the chunk into words to check length.
-        words = chunk_text.split()
-        if len(words) > split_threshold:
-            # Split into two parts (roughly equal halves).
-            mid_point = len(words) // 2
-            part1_text = " ".join(words[:mid_point])
-            part2_text = " ".join(words[mid_point:])
-            
-            chunks.append({
-                'header': header_line,
-                'level': header_level,
-                'content': part1_text,
-                'part': 1
-            })
-            chunks.append({
-                'header': header_line,
-                'level': header_level,
-                'content': part2_text,
-                'part': 2
-            })
-        else:
-            chunks.append({
+    count_tokens = get_token_counter(tokenizer)
+
+    for header_line, header_level, body in _iter_sections(markdown_text):
+        header_tokens = count_tokens(header_line) if header_line else 0
+        budget = max(max_tokens - header_tokens, 1)
+
+        def make_chunk(blocks, part):
+            text = "\n\n".join(blocks)
+            chunk = {
                 'header': header_line,
                 'level': header_level,
-                'content': chunk_text
-            })
-    
-    return chunks
+                'content': f"{header_line}\n\n{text}" if header_line else text
+            }
+            if part is not None:
+                chunk['part'] = part
+            return chunk
+
+        window, window_tokens = [], 0
+        part = 0
+        pending = None
+        for block, is_table in _iter_blocks(body):
+            block_tokens = count_tokens(block)
+            pieces = [(block, block_tokens)] if block_tokens <= budget else [
+                (piece, count_tokens(piece)) for piece in _split_oversized_block(block, is_table, budget, count_tokens, overlap_tokens)
+            ]
+            for piece, piece_tokens in pieces:
+                if window and window_tokens + piece_tokens > budget:
+                    # Emit the previous full window once we know another one follows.
+                    if pending is not None:
+                        yield pending
+                    part += 1
+                    pending = make_chunk([prev_piece for prev_piece, _ in window], part)
+
+                    # Carry trailing blocks forward as overlap, never the whole window.
+                    carried, carried_tokens = [], 0
+                    for prev_piece, prev_tokens in reversed(window[1:]):
+                        if carried_tokens + prev_tokens > overlap_tokens:
+                            break
+                        carried.insert(0, (prev_piece, prev_tokens))
+                        carried_tokens += prev_tokens
+                    # Fill the rest of the overlap with the tail of the next block back,
+                    # so long paragraphs and tables still overlap
+                    if overlap_tokens > carried_tokens:
+                        tail = _block_tail(window[len(window) - len(carried) - 1][0],
+                                           overlap_tokens - carried_tokens, count_tokens)
+                        if tail:
+                            tail_tokens = count_tokens(tail)
+                            carried.insert(0, (tail, tail_tokens))
+                            carried_tokens += tail_tokens
+                    if carried_tokens + piece_tokens > budget:
+                        carried, carried_tokens = [], 0
+                    window, window_tokens = carried, carried_tokens
+                window.append((piece, piece_tokens))
+                window_tokens += piece_tokens
+        if pending is not None:
+            yield pending
+            part += 1
+            yield make_chunk([piece for piece, _ in window], part)
+        elif window or header_line:
+            yield make_chunk([piece for piece, _ in window], None)
+
+
+def chunk_markdown_by_headers(markdown_text, max_tokens=256, overlap_tokens=32, tokenizer=None):
+    """
+    Splits the markdown content into token-bounded chunks based on headers.
+    See iter_markdown_chunks for the chunk format; this returns them as a list.
+    """
+    return list(iter_markdown_chunks(markdown_text, max_tokens, overlap_tokens, tokenizer))
 
 # # --- Main Section ---
 # if __name__ == "__main__":
 #     file_path = "/Users/janvichitroda/Documents/Janvi/NEU/Big_Data_Intelligence_Analytics/Assignment 5/Part 1/Github_Repo/Agentic_Research_Assistant/input/2022_Fourth_Quarter.md"
-    
+
 #     # Read the file content
 #     with open(file_path, "r", encoding="utf-8") as f:
 #         sample_markdown = f.read()
-    
+
 #     # Get chunks from the markdown content
 #     chunks = chunk_markdown_by_headers(sample_markdown)
 
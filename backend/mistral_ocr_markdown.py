@@ -1,6 +1,8 @@
 import os
 from mistralai import Mistral
 from dotenv import load_dotenv
+from pdf_text_layer import count_pages, iter_text_layer_pages
+from page_cache import get_page_cache, pdf_content_hash
 
 # Load environment variables from .env file
 load_dotenv()
@@ -10,35 +12,119 @@ MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
 INPUT_FILE_PATH = "pdf/2025/2025_Third_Quarter.pdf"
 OUTPUT_FILE_PATH = "markdown/2025/2025_Third_Quarter.md"
 
+# Pages sent to Mistral OCR per request; each finished batch is cached before the next
+OCR_BATCH_SIZE = 10
+
 # Initialize Mistral client
 mistral_client = Mistral(api_key=MISTRAL_API_KEY)
 
+def ocr_pdf_pages(pdf_url, pages=None):
+    """
+    Run Mistral OCR on a PDF and return {page index: markdown}.
+    If pages (0-based indexes) is given, only those pages are processed.
+    """
+    try:
+        document = {
+            "type": "document_url",
+            "document_url": pdf_url,
+        }
+        if pages is not None:
+            ocr_response = mistral_client.ocr.process(model="mistral-ocr-latest", document=document, pages=list(pages))
+        else:
+            ocr_response = mistral_client.ocr.process(model="mistral-ocr-latest", document=document)
+
+        return {page.index: page.markdown for page in ocr_response.pages}
+
+    except Exception as e:
+        raise Exception(f"Failed to extract text using Mistral OCR: {str(e)}")
+
+
 def extract_text_from_pdf(pdf_url):
     """Extract text from PDF using Mistral OCR API."""
-    try:
-        # Process the document using Mistral OCR
-        ocr_response = mistral_client.ocr.process(
-            model="mistral-ocr-latest",
-            document={
-                "type": "document_url",
-                "document_url": pdf_url,
-            },
-        )
+    ocr_pages = ocr_pdf_pages(pdf_url)
 
-        # Combine all pages into one markdown document
-        all_pages_markdown = []
+    # Combine all pages into one markdown document
+    markdown_content = "\n\n".join(ocr_pages[index] for index in sorted(ocr_pages))
 
-        for page in ocr_response.pages:
-            all_pages_markdown.append(page.markdown)
+    print(f"Successfully extracted {len(markdown_content)} characters with Mistral OCR")
 
-        markdown_content = "\n\n".join(all_pages_markdown)
+    return markdown_content
 
-        print(f"Successfully extracted {len(markdown_content)} characters with Mistral OCR")
-        
-        return markdown_content
 
-    except Exception as e:
-        raise Exception(f"Failed to extract text using Mistral OCR: {str(e)}")
+def convert_pdf_to_markdown(pdf_bytes, pdf_url=None, page_cache=None):
+    """
+    Convert a PDF to markdown, using the local text layer where possible and
+    Mistral OCR only for pages without usable text.
+
+    Every converted page is cached under (PDF content hash, page number), so a
+    failed conversion resumes from the pages already done and an already-seen
+    filing is assembled purely from the cache.
+
+    Args:
+        pdf_bytes: The PDF file content.
+        pdf_url: URL Mistral can fetch the PDF from. If None, runs offline and
+            pages without a text layer are left empty (and not cached).
+        page_cache: Page cache to use; defaults to get_page_cache().
+
+    Returns:
+        (markdown_content, page_sources): the combined markdown and a per-page list of
+        {"page", "source", "chars"} where source is "text_layer", "ocr" or "skipped".
+    """
+    page_cache = page_cache or get_page_cache()
+    pdf_hash = pdf_content_hash(pdf_bytes)
+
+    manifest = page_cache.get_manifest(pdf_hash)
+    page_count = manifest["page_count"] if manifest else count_pages(pdf_bytes)
+
+    entries = {}
+    if manifest and manifest.get("complete"):
+        for index in range(page_count):
+            entries[index] = page_cache.get_page(pdf_hash, index + 1)
+        print(f"Assembled {page_count} pages from the page cache")
+    else:
+        for index in range(page_count):
+            entry = page_cache.get_page(pdf_hash, index + 1)
+            if entry is not None:
+                entries[index] = entry
+        if entries:
+            print(f"Resuming conversion: {len(entries)}/{page_count} pages already cached")
+
+        # Text-layer pages are cheap, cache them as they are produced
+        ocr_indexes = []
+        pending = [index for index in range(page_count) if index not in entries]
+        for index, markdown in iter_text_layer_pages(pdf_bytes, pending):
+            if markdown is None:
+                ocr_indexes.append(index)
+            else:
+                entries[index] = {"markdown": markdown, "source": "text_layer"}
+                page_cache.put_page(pdf_hash, index + 1, entries[index])
+
+        if ocr_indexes and pdf_url:
+            # OCR in batches so a failure keeps every page finished before it
+            for start in range(0, len(ocr_indexes), OCR_BATCH_SIZE):
+                batch = ocr_indexes[start:start + OCR_BATCH_SIZE]
+                ocr_pages = ocr_pdf_pages(pdf_url, batch)
+                for index in batch:
+                    entries[index] = {"markdown": ocr_pages.get(index, ""), "source": "ocr"}
+                    page_cache.put_page(pdf_hash, index + 1, entries[index])
+
+        complete = len(entries) == page_count
+        page_cache.put_manifest(pdf_hash, {"page_count": page_count, "complete": complete})
+
+    all_pages_markdown = []
+    page_sources = []
+    for index in range(page_count):
+        entry = entries.get(index) or {"markdown": "", "source": "skipped"}
+        all_pages_markdown.append(entry["markdown"])
+        page_sources.append({"page": index + 1, "source": entry["source"], "chars": len(entry["markdown"])})
+
+    markdown_content = "\n\n".join(page for page in all_pages_markdown if page)
+
+    counts = {source: sum(1 for page in page_sources if page["source"] == source) for source in ("text_layer", "ocr", "skipped")}
+    print(f"Converted {page_count} pages: {counts['text_layer']} from text layer, "
+          f"{counts['ocr']} with Mistral OCR, {counts['skipped']} skipped")
+
+    return markdown_content, page_sources
 
 
 # def main():
@@ -1,9 +1,17 @@
 from backend.nvidia_pdf_extraction import fetch_nvidia_financial_reports
-from backend.s3_utils import fetch_s3_urls, get_presigned_url, upload_to_s3
-from backend.mistral_ocr_markdown import extract_text_from_pdf
+from backend.s3_utils import fetch_s3_urls, get_presigned_url, upload_to_s3, download_from_s3
+from backend.mistral_ocr_markdown import convert_pdf_to_markdown
 from backend.pinecone_db import extract_filename_year_quarter, AgenticResearchAssistant
+from backend.pipeline_runner import PipelineRunner, Stage, CheckpointStore
+from backend.boilerplate import BoilerplateRegistry
+from backend.financial_facts import FactStore, extract_filing_facts
+import argparse
+import json
 import time
 
+# Per-document ingestion state (queued -> converted -> normalized -> facts_extracted -> embedded)
+CHECKPOINT_PATH = "data/ingestion_checkpoint.json"
+
 def fetch_pdf_s3_upload():
     # Step 1: Fetch NVIDIA financial reports
     print("Step 1: Fetching financial reports...")
@@ -13,37 +21,121 @@ def fetch_pdf_s3_upload():
         print(f"Fetched: {report['pdf_filename']} (Size: {report['content']} bytes)")
     return reports
 
-def convert_markdown_s3_upload():
-    # Instantiate the OCR extractor only once
-    s3_urls = fetch_s3_urls("pdf/")
-    s3_urls = s3_urls[1:]
-    for input_url in s3_urls:
-        output_url = "markdown"+input_url[3:-3]+"md"
-        pdf_url = get_presigned_url(input_url)
-        markdown_content = extract_text_from_pdf(pdf_url)
-        upload_to_s3(output_url, markdown_content)
-        print(f"{input_url} converted to md")
+def markdown_key_for(pdf_key):
+    """pdf/2024/2024_First_Quarter.pdf -> markdown/2024/2024_First_Quarter.md"""
+    return "markdown"+pdf_key[3:-3]+"md"
+
+def convert_document(pdf_key):
+    """Converts one PDF under pdf/ to markdown under markdown/."""
+    # Per-page record of text-layer vs OCR conversion, kept outside markdown/ so it is not embedded
+    manifest_key = "conversion"+pdf_key[3:-3]+"json"
+    pdf_bytes = download_from_s3(pdf_key)
+    pdf_url = get_presigned_url(pdf_key)
+    markdown_content, page_sources = convert_pdf_to_markdown(pdf_bytes, pdf_url)
+    upload_to_s3(markdown_key_for(pdf_key), markdown_content)
+    upload_to_s3(manifest_key, json.dumps(page_sources))
+    print(f"{pdf_key} converted to md")
+    # Only throttle when the OCR API was actually called
+    if any(page["source"] == "ocr" for page in page_sources):
         time.sleep(10)
 
+def normalize_document(registry, markdown_key):
+    """Registers a filing's paragraphs in the corpus-wide boilerplate registry."""
+    filename = markdown_key.split("/")[-1]
+    _, year, quarter = extract_filename_year_quarter(markdown_key)
+    markdown_text = download_from_s3(markdown_key).decode("utf-8")
+    registry.register(filename, f"{year}_{quarter}", markdown_text)
+
+def extract_facts_document(fact_store, markdown_key):
+    """Parses a filing's financial tables into the columnar fact store."""
+    filename = markdown_key.split("/")[-1]
+    _, year, quarter = extract_filename_year_quarter(markdown_key)
+    markdown_text = download_from_s3(markdown_key).decode("utf-8")
+    fact_count = extract_filing_facts(fact_store, filename, year, quarter, markdown_text)
+    print(f"Extracted {fact_count} financial facts from {filename}")
+
+def embed_document(assistant, markdown_key, registry=None):
+    """Embeds one markdown file into Pinecone, stripping shared boilerplate if a registry is given."""
+    url = get_presigned_url(markdown_key)
+    filename, year, quarter = extract_filename_year_quarter(url)  # Extract metadata from filename
+    if not assistant.insert_embeddings(url, year, quarter, filename, boilerplate_registry=registry):
+        raise Exception(f"Failed to insert embeddings for {markdown_key}")
+    print(f"Inserted Embeddings for the {year} and {quarter}")
+
+def convert_markdown_s3_upload():
+    pdf_keys = [key for key in fetch_s3_urls("pdf/") if key.endswith(".pdf")]
+    for pdf_key in pdf_keys:
+        convert_document(pdf_key)
+
 def generate_pinecone_embeddings(assistant):
-    """Fetch all markdown URLs under the 'markdown' folder and convert them to presigned URLs."""
+    """Fetch all markdown files under the 'markdown' folder and insert their embeddings into Pinecone."""
     print("Fetching markdown files...")
-    markdown_urls = fetch_s3_urls("markdown/")
-    markdown_urls = markdown_urls[1:]
-    presigned_urls = [get_presigned_url(url) for url in markdown_urls]
-    print(f"Fetched {len(presigned_urls)} markdown files.")
+    markdown_keys = [key for key in fetch_s3_urls("markdown/") if key.endswith(".md")]
+    print(f"Fetched {len(markdown_keys)} markdown files.")
 
-    # Step 2: Process each markdown file and insert embeddings into Pinecone
-    for url in presigned_urls:
-        print(url)
-        filename, year, quarter = extract_filename_year_quarter(url)  # Extract metadata from filename
-        assistant.insert_embeddings(url, year, quarter, filename)
-        print(f"Inserted Embeddings for the {year} and {quarter}")
+    # Step 2: Register every filing's paragraphs so shared boilerplate is known up front,
+    # and parse its financial tables into the fact store
+    registry = BoilerplateRegistry()
+    fact_store = FactStore()
+    for markdown_key in markdown_keys:
+        normalize_document(registry, markdown_key)
+        extract_facts_document(fact_store, markdown_key)
 
+    # Step 3: Process each markdown file and insert embeddings into Pinecone
+    for markdown_key in markdown_keys:
+        embed_document(assistant, markdown_key, registry)
+    assistant.upsert_shared_blocks(registry.shared_blocks())
+
+def run_ingestion_pipeline(scrape=False, checkpoint_path=CHECKPOINT_PATH):
+    """
+    Runs scrape -> convert -> normalize -> extract facts -> embed with a per-document checkpoint.
+
+    Documents flow through the stages as a pipeline (one is embedded while the
+    next is being converted) and a rerun resumes each document after its last
+    completed stage.
+    """
+    pdf_keys = [key for key in fetch_s3_urls("pdf/") if key.endswith(".pdf")]
+    if scrape or not pdf_keys:
+        fetch_pdf_s3_upload()
+        pdf_keys = [key for key in fetch_s3_urls("pdf/") if key.endswith(".pdf")]
 
-if __name__ == '__main__':
-    # Run the pipeline only once
-    reports = fetch_pdf_s3_upload()
-    convert_markdown_s3_upload()
     assistant = AgenticResearchAssistant()
-    generate_pinecone_embeddings(assistant)
\ No newline at end of file
+    registry = BoilerplateRegistry()
+    fact_store = FactStore()
+    checkpoint = CheckpointStore(checkpoint_path)
+    runner = PipelineRunner(
+        stages=[
+            Stage("converted", convert_document),
+            Stage("normalized", lambda pdf_key: normalize_document(registry, markdown_key_for(pdf_key))),
+            Stage("facts_extracted", lambda pdf_key: extract_facts_document(fact_store, markdown_key_for(pdf_key))),
+            Stage("embedded", lambda pdf_key: embed_document(assistant, markdown_key_for(pdf_key), registry)),
+        ],
+        checkpoint=checkpoint,
+        initial_state="queued"
+    )
+    results = runner.run(pdf_keys)
+
+    # Filings embedded before a paragraph of theirs turned out to be shared are re-synced;
+    # content-addressed ids and the embedding cache make this an incremental update.
+    stale = set(registry.stale_filings())
+    for pdf_key, state in results.items():
+        markdown_key = markdown_key_for(pdf_key)
+        if state == "embedded" and markdown_key.split("/")[-1] in stale:
+            print(f"Re-syncing {markdown_key} after new shared boilerplate was found")
+            embed_document(assistant, markdown_key, registry)
+    assistant.upsert_shared_blocks(registry.shared_blocks())
+
+    failed = [pdf_key for pdf_key, state in results.items() if state != "embedded"]
+    print(f"Ingestion finished: {len(results) - len(failed)}/{len(results)} documents embedded")
+    for pdf_key in failed:
+        print(f"  Incomplete: {pdf_key} (last state: {results[pdf_key]})")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Ingest NVIDIA quarterly reports into Pinecone")
+    parser.add_argument("--scrape", action="store_true", help="Re-scrape the investor site before ingesting")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH, help="Path of the per-document checkpoint file")
+    args = parser.parse_args()
+
+    run_ingestion_pipeline(scrape=args.scrape, checkpoint_path=args.checkpoint)
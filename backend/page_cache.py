@@ -0,0 +1,80 @@
+import os
+import json
+import hashlib
+from s3_utils import get_s3_client
+
+PAGE_CACHE_BACKEND = os.getenv("PAGE_CACHE_BACKEND", "local")
+LOCAL_PAGE_CACHE_DIR = os.getenv("PAGE_CACHE_DIR", "data/page_cache")
+S3_PAGE_CACHE_PREFIX = "page_cache"
+
+
+def pdf_content_hash(pdf_bytes):
+    """Returns the cache key for a PDF's content."""
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+class LocalPageCache:
+    """
+    Stores converted pages as <dir>/<pdf hash>/page_<n>.json files.
+    Each entry holds the page markdown and which path produced it.
+    """
+
+    def __init__(self, directory=LOCAL_PAGE_CACHE_DIR):
+        self.directory = directory
+
+    def _path(self, pdf_hash, name):
+        return os.path.join(self.directory, pdf_hash, f"{name}.json")
+
+    def _read(self, path):
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write(self, path, value):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)
+
+    def get_page(self, pdf_hash, page):
+        return self._read(self._path(pdf_hash, f"page_{page:04d}"))
+
+    def put_page(self, pdf_hash, page, entry):
+        self._write(self._path(pdf_hash, f"page_{page:04d}"), entry)
+
+    def get_manifest(self, pdf_hash):
+        return self._read(self._path(pdf_hash, "manifest"))
+
+    def put_manifest(self, pdf_hash, manifest):
+        self._write(self._path(pdf_hash, "manifest"), manifest)
+
+
+class S3PageCache(LocalPageCache):
+    """Same layout as LocalPageCache, stored under the page_cache/ prefix of the S3 bucket."""
+
+    def __init__(self, prefix=S3_PAGE_CACHE_PREFIX):
+        self.directory = prefix
+        self.s3_client = get_s3_client()
+        self.bucket_name = os.getenv('AWS_S3_BUCKET_NAME')
+
+    def _path(self, pdf_hash, name):
+        return f"{self.directory}/{pdf_hash}/{name}.json"
+
+    def _read(self, path):
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=path)
+        except self.s3_client.exceptions.NoSuchKey:
+            return None
+        return json.loads(response['Body'].read())
+
+    def _write(self, path, value):
+        self.s3_client.put_object(Bucket=self.bucket_name, Key=path, Body=json.dumps(value))
+
+
+def get_page_cache(backend=PAGE_CACHE_BACKEND):
+    """Returns the page cache configured by PAGE_CACHE_BACKEND ('local' or 's3')."""
+    if backend == "s3":
+        return S3PageCache()
+    return LocalPageCache()
@@ -0,0 +1,128 @@
+import re
+from collections import Counter
+import pymupdf
+
+# A page needs at least this many non-whitespace characters in its text layer
+# to skip OCR; scanned pages and exhibit cover images fall below it.
+MIN_PAGE_CHARS = 200
+
+# Share of characters that must be letters, digits or common punctuation;
+# broken font encodings produce text layers full of replacement glyphs.
+MIN_READABLE_RATIO = 0.85
+
+_READABLE = re.compile(r"[\w\s.,;:()$%'\"&/\-–—’“”]")
+
+
+def has_usable_text(text, min_chars=MIN_PAGE_CHARS):
+    """Checks whether a page's text layer is good enough to use instead of OCR."""
+    compact = "".join(text.split())
+    if len(compact) < min_chars:
+        return False
+    readable = len(_READABLE.findall(compact))
+    return readable / len(compact) >= MIN_READABLE_RATIO
+
+
+def _inside(bbox, table_bboxes):
+    """Checks whether the center of bbox falls inside any table bbox."""
+    x = (bbox[0] + bbox[2]) / 2
+    y = (bbox[1] + bbox[3]) / 2
+    return any(tx0 <= x <= tx1 and ty0 <= y <= ty1 for tx0, ty0, tx1, ty1 in table_bboxes)
+
+
+def _body_font_size(blocks):
+    """Returns the font size covering the most characters on the page."""
+    sizes = Counter()
+    for block in blocks:
+        for line in block.get("lines", []):
+            for span in line["spans"]:
+                sizes[round(span["size"], 1)] += len(span["text"].strip())
+    return sizes.most_common(1)[0][0] if sizes else 0
+
+
+def _header_prefix(spans, body_size):
+    """Returns a markdown header prefix for a heading line, or '' for body text."""
+    text = "".join(span["text"] for span in spans).strip()
+    if not text or len(text.split()) > 15:
+        return ""
+    size = max(span["size"] for span in spans)
+    if body_size and size >= body_size * 1.6:
+        return "# "
+    if body_size and size >= body_size * 1.3:
+        return "## "
+    # SEC filings mark item/section headings as bold text at body size
+    is_bold = all(span["flags"] & 16 for span in spans if span["text"].strip())
+    if is_bold and not text.endswith("."):
+        return "### "
+    return ""
+
+
+def page_to_markdown(page):
+    """
+    Converts one PDF page's text layer to markdown.
+    Larger or bold short lines become headers and detected tables are rendered as markdown tables.
+    """
+    try:
+        tables = list(page.find_tables())
+    except Exception:
+        tables = []
+    table_bboxes = [tuple(table.bbox) for table in tables]
+
+    blocks = page.get_text("dict")["blocks"]
+    body_size = _body_font_size(blocks)
+
+    # (y position, markdown) pieces, sorted into reading order at the end
+    pieces = []
+    for table in tables:
+        try:
+            pieces.append((table.bbox[1], table.to_markdown().strip()))
+        except Exception:
+            continue
+
+    for block in blocks:
+        if block.get("type") != 0 or _inside(block["bbox"], table_bboxes):
+            continue
+        paragraph = []
+        for line in block["lines"]:
+            text = "".join(span["text"] for span in line["spans"]).strip()
+            if not text:
+                continue
+            prefix = _header_prefix(line["spans"], body_size)
+            if prefix:
+                if paragraph:
+                    pieces.append((block["bbox"][1], " ".join(paragraph)))
+                    paragraph = []
+                pieces.append((line["bbox"][1], prefix + text))
+            else:
+                paragraph.append(text)
+        if paragraph:
+            pieces.append((block["bbox"][1], " ".join(paragraph)))
+
+    pieces.sort(key=lambda piece: piece[0])
+    return "\n\n".join(markdown for _, markdown in pieces if markdown)
+
+
+def count_pages(pdf_bytes):
+    """Returns the number of pages in a PDF."""
+    with pymupdf.open(stream=pdf_bytes, filetype="pdf") as doc:
+        return doc.page_count
+
+
+def iter_text_layer_pages(pdf_bytes, pages=None, min_chars=MIN_PAGE_CHARS):
+    """
+    Lazily extracts markdown from the embedded text layer of the given pages.
+
+    Args:
+        pdf_bytes: The PDF file content.
+        pages: Optional iterable of 0-based page indexes; defaults to every page.
+
+    Yields:
+        (index, markdown): markdown is None where the page has no usable text layer
+        and needs OCR.
+    """
+    with pymupdf.open(stream=pdf_bytes, filetype="pdf") as doc:
+        for index in (range(doc.page_count) if pages is None else pages):
+            page = doc[index]
+            if has_usable_text(page.get_text("text"), min_chars):
+                yield index, page_to_markdown(page)
+            else:
+                yield index, None
@@ -1,15 +1,50 @@
 import os
+import json
+import re
+import hashlib
 import logging
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
 from pinecone import Pinecone, ServerlessSpec
 import google.generativeai as genai
-from markdown_chunking import chunk_markdown_by_headers
+from markdown_chunking import iter_markdown_chunks
+from embedding_cache import EmbeddingCache, get_sentence_model, model_fingerprint, DEFAULT_MODEL_NAME
+from financial_facts import is_lookup_question, reported_figures
 import requests
 from urllib.parse import urlparse
 
 load_dotenv()
 
+# Local record of which vector ids were upserted for each filing
+CHUNK_INDEX_PATH = os.getenv("CHUNK_INDEX_PATH", "data/chunk_index.json")
+
+# Pinecone request limits
+UPSERT_BATCH_SIZE = 100
+DELETE_BATCH_SIZE = 1000
+
+def chunk_id_prefix(filename):
+    """Id prefix shared by every chunk vector of a filing."""
+    return f"{os.path.splitext(os.path.basename(filename))[0]}_"
+
+def make_chunk_id(filename, content):
+    """Builds a stable vector id from the filing name and a hash of the chunk text."""
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+    return f"{chunk_id_prefix(filename)}{digest}"
+
+def load_chunk_index(path=CHUNK_INDEX_PATH):
+    """Loads the filename -> [vector ids] index written by save_chunk_index."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_chunk_index(chunk_index, path=CHUNK_INDEX_PATH):
+    """Atomically writes the filename -> [vector ids] index."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(chunk_index, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
 def extract_filename_year_quarter(url: str):
     """
     Extracts the filename, year, and quarter from a given URL.
@@ -79,64 +114,196 @@ class AgenticResearchAssistant:
         logging.info(f"Pinecone index stats: {self.index.describe_index_stats()}")
         
         # Load Sentence Transformer Model
-        self.model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+        self.model_name = DEFAULT_MODEL_NAME
+        self.model = get_sentence_model(self.model_name)
         logging.info("Sentence Transformer model loaded.")
 
+        # Chunk embeddings are reused across index rebuilds; only new text is encoded
+        self.embedding_cache = EmbeddingCache(
+            model_name=self.model_name,
+            model_revision=model_fingerprint(self.model),
+            dimension=self.dimension
+        )
+
+        # Chunk token budget: the model's window minus the [CLS]/[SEP] special tokens
+        self.chunk_max_tokens = self.model.max_seq_length - 2
+        self.chunk_overlap_tokens = 32
+
+    def chunk_markdown(self, markdown_text):
+        """Splits markdown into chunks that fit the embedding model's token window."""
+        return iter_markdown_chunks(
+            markdown_text,
+            max_tokens=self.chunk_max_tokens,
+            overlap_tokens=self.chunk_overlap_tokens,
+            tokenizer=self.model.tokenizer
+        )
+
     def process_markdown(self, file_path):
         """Reads a markdown file and processes it into chunks."""
         try:
             with open(file_path, "r", encoding="utf-8") as f:
                 markdown_text = f.read()
-            chunks = chunk_markdown_by_headers(markdown_text)
+            chunks = list(self.chunk_markdown(markdown_text))
             logging.info(f"Extracted {len(chunks)} chunks from markdown file.")
             return chunks
         except Exception as e:
             logging.error(f"Error reading markdown file: {e}")
             return []
 
-    def insert_embeddings(self, presigned_url, year, quarter, filename):
-        """Processes markdown from a presigned URL, generates embeddings, and inserts into Pinecone."""
+    def insert_embeddings(self, presigned_url, year, quarter, filename, reindex=False, boilerplate_registry=None):
+        """
+        Processes markdown from a presigned URL, generates embeddings, and syncs them into Pinecone.
+        If a boilerplate_registry is given, page furniture and paragraphs shared with other
+        filings are stripped first (they are indexed once by upsert_shared_blocks).
+
+        Vector ids are derived from the filename and chunk content, so re-ingesting a filing
+        only upserts chunks whose text changed and deletes the ids that no longer exist.
+        Filings missing from the local chunk index (e.g. a fresh container) have their
+        previous ids listed from Pinecone instead. Pass reindex=True to upsert every chunk regardless of the local index (e.g. after a
+        Pinecone reset).
+
+        Returns True if the filing was synced, False if an error occurred.
+        """
         try:
             # Fetch markdown content from the presigned URL
             response = requests.get(presigned_url)
             response.raise_for_status()  # Raise an error for failed requests
             markdown_text = response.text
+            if boilerplate_registry is not None:
+                markdown_text = boilerplate_registry.normalize(filename, markdown_text)
             
-            # Process chunks from markdown content
-            chunks = chunk_markdown_by_headers(markdown_text)
-            if not chunks:
+            # Process chunks from markdown content, keyed by content-addressed id
+            chunks_by_id = {}
+            for chunk in self.chunk_markdown(markdown_text):
+                chunks_by_id.setdefault(make_chunk_id(filename, chunk["content"]), chunk)
+            if not chunks_by_id:
                 logging.warning("No chunks extracted. Skipping embedding.")
-                return
+                return True
+
+            chunk_index = load_chunk_index()
+            if filename in chunk_index:
+                previous_ids = set(chunk_index[filename])
+            else:
+                previous_ids = self.list_filing_ids(filename)
+            current_ids = set(chunks_by_id)
+
+            new_ids = [chunk_id for chunk_id in chunks_by_id if reindex or chunk_id not in previous_ids]
+            stale_ids = sorted(previous_ids - current_ids)
+
+            if new_ids:
+                # Extract only the text content from new chunks
+                chunk_texts = [chunks_by_id[chunk_id]["content"] for chunk_id in new_ids]
+
+                # Generate embeddings
+                embeddings = self.embedding_cache.encode(self.model, chunk_texts).tolist()
+                logging.info(f"Generated embeddings for {len(embeddings)} chunks.")
+
+                # Prepare batch upserts for Pinecone
+                pinecone_data = []
+                for chunk_id, embedding in zip(new_ids, embeddings):
+                    chunk = chunks_by_id[chunk_id]
+                    metadata = {
+                        "text": chunk["content"],
+                        "header": chunk.get("header") or "No Header",
+                        "level": str(chunk.get("level") or "Unknown"),
+                        "part": str(chunk.get("part")) if chunk.get("part") is not None else "None",
+                        "year": year,
+                        "quarter": quarter,
+                        "filename": filename
+                    }
+                    pinecone_data.append((chunk_id, embedding, metadata))
 
-            # Extract only the text content from chunks
-            chunk_texts = [chunk["content"] for chunk in chunks]
+                # Insert data into Pinecone in batches
+                for start in range(0, len(pinecone_data), UPSERT_BATCH_SIZE):
+                    self.index.upsert(pinecone_data[start:start + UPSERT_BATCH_SIZE])
+                logging.info(f"Inserted {len(pinecone_data)} chunks into Pinecone successfully.")
 
-            # Generate embeddings
-            embeddings = self.model.encode(chunk_texts).tolist()
-            logging.info(f"Generated embeddings for {len(embeddings)} chunks.")
+            if filename not in chunk_index:
+                # First sync for this filing: remove vectors written with the old positional ids
+                self.delete_legacy_vectors(year, quarter)
 
-            # Prepare batch upserts for Pinecone
+            # Remove vectors for chunks that no longer exist in the filing
+            for start in range(0, len(stale_ids), DELETE_BATCH_SIZE):
+                self.index.delete(ids=stale_ids[start:start + DELETE_BATCH_SIZE])
+            if stale_ids:
+                logging.info(f"Deleted {len(stale_ids)} stale chunks for {filename}.")
+
+            chunk_index[filename] = sorted(current_ids)
+            save_chunk_index(chunk_index)
+            logging.info(f"{filename}: {len(current_ids)} chunks indexed ({len(new_ids)} new, {len(stale_ids)} removed).")
+            return True
+        except Exception as e:
+            logging.error(f"Error processing presigned URL: {e}")
+            return False
+
+    def upsert_shared_blocks(self, shared_blocks):
+        """
+        Indexes boilerplate paragraphs shared across filings once each.
+        Each vector lists every period ("<year>_<quarter>") the paragraph appears in.
+        """
+        try:
+            if not shared_blocks:
+                return True
+            texts = [block["text"] for block in shared_blocks]
+            embeddings = self.embedding_cache.encode(self.model, texts).tolist()
             pinecone_data = []
-            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
+            for block, embedding in zip(shared_blocks, embeddings):
+                year, quarter = block["periods"][-1].split("_")
                 metadata = {
-                    "text": chunk["content"],
-                    "header": chunk.get("header", "No Header"),
-                    "level": str(chunk.get("level", "Unknown")),
-                    "part": str(chunk.get("part")) if chunk.get("part") is not None else "None",
+                    "text": block["text"],
+                    "header": "Shared boilerplate",
+                    "level": "Unknown",
+                    "part": "None",
                     "year": year,
                     "quarter": quarter,
-                    "filename": filename
+                    "periods": block["periods"],
+                    "filename": "shared"
                 }
-                pinecone_data.append((f"{year}_{quarter}_{i}", embedding, metadata))
-            
-            # Insert data into Pinecone in batch
-            self.index.upsert(pinecone_data)
-            logging.info(f"Inserted {len(pinecone_data)} chunks into Pinecone successfully.")
+                pinecone_data.append((f"shared_{block['hash'][:16]}", embedding, metadata))
+            for start in range(0, len(pinecone_data), UPSERT_BATCH_SIZE):
+                self.index.upsert(pinecone_data[start:start + UPSERT_BATCH_SIZE])
+            logging.info(f"Upserted {len(pinecone_data)} shared boilerplate blocks.")
+            return True
         except Exception as e:
-            logging.error(f"Error processing presigned URL: {e}")
+            logging.error(f"Error upserting shared blocks: {e}")
+            return False
+
+    def list_filing_ids(self, filename):
+        """Lists the chunk vector ids stored in Pinecone for a filing."""
+        prefix = chunk_id_prefix(filename)
+        # Skip filings whose name merely extends this one's (e.g. "<stem>_amended_...")
+        own_id = re.compile(rf"{re.escape(prefix)}[0-9a-f]{{16}}")
+        try:
+            ids = {chunk_id for page in self.index.list(prefix=prefix) for chunk_id in page if own_id.fullmatch(chunk_id)}
+            logging.info(f"Found {len(ids)} vectors in Pinecone for {filename}.")
+            return ids
+        except Exception as e:
+            logging.warning(f"Could not list vectors for {filename}: {e}")
+            return set()
+
+    def delete_legacy_vectors(self, year, quarter):
+        """Deletes vectors stored under the old f"{year}_{quarter}_{i}" id scheme."""
+        try:
+            for ids in self.index.list(prefix=f"{year}_{quarter}_"):
+                if ids:
+                    self.index.delete(ids=list(ids))
+                    logging.info(f"Deleted {len(ids)} legacy vectors for {year} Q{quarter}.")
+        except Exception as e:
+            logging.warning(f"Could not clean up legacy vectors for {year} Q{quarter}: {e}")
         
     def search_pinecone_db(self, query, year_quarter_dict, top_k=20):
         """Search for relevant chunks in Pinecone, filtering by multiple years and quarters, and generate a response using Gemini."""
+        # Plain lookups/comparisons of reported line items are answered from the fact store;
+        # for other questions the figures are added to the RAG context
+        figures = None
+        try:
+            figures = reported_figures(query, year_quarter_dict)
+            if figures and is_lookup_question(query):
+                logging.info("Answered from the financial fact store.")
+                return figures
+        except Exception as e:
+            logging.warning(f"Fact store lookup failed, falling back to RAG: {e}")
+
         query_embedding = self.model.encode([query]).tolist()
         try:
             # Construct metadata filter for multiple years and quarters
@@ -144,6 +311,9 @@ class AgenticResearchAssistant:
                 "$or": [
                     {"year": {"$eq": str(year)}, "quarter": {"$in": [str(q) for q in quarters]}}
                     for year, quarters in year_quarter_dict.items()
+                ] + [
+                    # Shared boilerplate blocks carry every period they appear in
+                    {"periods": {"$in": [f"{year}_{q}" for year, quarters in year_quarter_dict.items() for q in quarters]}}
                 ]
             }
             print(filter_criteria)
@@ -159,7 +329,7 @@ class AgenticResearchAssistant:
             matches = results.get("matches", [])
             if not matches:
                 logging.warning(f"No relevant matches found for the given year-quarter combinations.")
-                return "No relevant information found for the specified year and quarters."
+                return figures or "No relevant information found for the specified year and quarters."
 
             # Extract matched texts along with their metadata
             retrieved_data = [(match["metadata"]["text"], match["metadata"]["year"], match["metadata"]["quarter"]) for match in matches]
@@ -167,6 +337,8 @@ class AgenticResearchAssistant:
             
             # Create context for Gemini
             context = "\n".join([f"Year: {year}, Quarter: {quarter} - {text}" for text, year, quarter in retrieved_data])
+            if figures:
+                context = f"{figures}\n\n{context}"
             prompt = f"""You are an AI assistant tasked with analyzing Nvidia's financial data. 
                     Below is relevant financial information retrieved from a vector database, with each entry associated with a specific year and quarter. 
                     Use this context to answer the question accurately.
@@ -0,0 +1,133 @@
+import os
+import json
+import threading
+import traceback
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Stage:
+    """A pipeline stage: func(doc_id) runs the work, done_state is recorded once it succeeds."""
+
+    def __init__(self, done_state, func, workers=1):
+        self.done_state = done_state
+        self.func = func
+        self.workers = workers
+
+
+class CheckpointStore:
+    """
+    Thread-safe per-document state persisted to a JSON file.
+    Each entry is {"state": <last completed state>, "updated_at": ..., "error": ...}.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._states = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._states = json.load(f)
+
+    def get(self, doc_id):
+        with self._lock:
+            return self._states.get(doc_id, {}).get("state")
+
+    def set(self, doc_id, state, error=None):
+        with self._lock:
+            entry = {"state": state, "updated_at": datetime.now().isoformat()}
+            if error:
+                entry["error"] = error
+            self._states[doc_id] = entry
+            self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._states, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+class PipelineRunner:
+    """
+    Runs documents through an ordered list of stages with a checkpoint per document.
+
+    Each stage has its own worker pool, so documents flow through as a pipeline:
+    while one document is in a later stage, the next is already in an earlier one.
+    A document resumes at the first stage after its checkpointed state, and a
+    failure stops only that document (its last good state is kept).
+    """
+
+    def __init__(self, stages, checkpoint, initial_state="queued"):
+        self.stages = stages
+        self.checkpoint = checkpoint
+        self.initial_state = initial_state
+        self.states = [initial_state] + [stage.done_state for stage in stages]
+
+    def _next_stage_index(self, doc_id):
+        state = self.checkpoint.get(doc_id)
+        if state is None:
+            self.checkpoint.set(doc_id, self.initial_state)
+            return 0
+        if state not in self.states:
+            return 0
+        return self.states.index(state)
+
+    def run(self, doc_ids):
+        """Runs all documents to the final stage and returns {doc_id: final state}."""
+        executors = [
+            ThreadPoolExecutor(max_workers=stage.workers, thread_name_prefix=stage.done_state)
+            for stage in self.stages
+        ]
+        in_flight = [0]
+        lock = threading.Lock()
+        all_done = threading.Event()
+        results = {}
+
+        def finish(doc_id, state):
+            with lock:
+                results[doc_id] = state
+                in_flight[0] -= 1
+                if in_flight[0] == 0:
+                    all_done.set()
+
+        def submit(doc_id, index):
+            if index == len(self.stages):
+                finish(doc_id, self.states[-1])
+                return
+            future = executors[index].submit(self.stages[index].func, doc_id)
+            future.add_done_callback(lambda f: on_done(doc_id, index, f))
+
+        def on_done(doc_id, index, future):
+            # Runs on a worker thread; any error here must still finish the document,
+            # otherwise in_flight never reaches 0 and run() waits forever
+            reached_state = self.states[index]
+            try:
+                error = future.exception()
+                if error is not None:
+                    print(f"❌ {doc_id} failed before '{self.stages[index].done_state}': {error}")
+                    traceback.print_exception(type(error), error, error.__traceback__)
+                    self.checkpoint.set(doc_id, reached_state, error=str(error))
+                    finish(doc_id, reached_state)
+                    return
+                self.checkpoint.set(doc_id, self.stages[index].done_state)
+                reached_state = self.stages[index].done_state
+                print(f"✅ {doc_id}: {reached_state}")
+                submit(doc_id, index + 1)
+            except Exception as e:
+                print(f"❌ {doc_id} could not continue after '{reached_state}': {e}")
+                traceback.print_exc()
+                finish(doc_id, reached_state)
+
+        starts = [(doc_id, self._next_stage_index(doc_id)) for doc_id in doc_ids]
+        in_flight[0] = len(starts)
+        if not starts:
+            all_done.set()
+        for doc_id, index in starts:
+            submit(doc_id, index)
+
+        all_done.wait()
+        for executor in executors:
+            executor.shutdown(wait=True)
+        return results
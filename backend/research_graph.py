@@ -51,9 +51,11 @@ def initialize_research_graph():
     
     return _GLOBAL_GRAPH
 
-def run_research_graph(query, year_quarter_dict=None, mode="combined"):
+def run_research_graph(query, year_quarter_dict=None, mode="combined", chart_format="png"):
     """
     Run the research workflow using the existing graph instance.
+    Returns (answer markdown, charts); charts holds Vega-Lite visualizations
+    when chart_format is "vega_lite" and is empty otherwise.
     """
     print("\n" + "#"*100)
     print(f"📊 STARTING RESEARCH GRAPH EXECUTION 📊")
@@ -69,7 +71,9 @@ def run_research_graph(query, year_quarter_dict=None, mode="combined"):
         "chat_history": [],
         "intermediate_steps": [],
         "metadata_filters": year_quarter_dict or {},
-        "mode": mode
+        "mode": mode,
+        "chart_format": chart_format,
+        "charts": []
     }
     
     # Get the existing graph instance
@@ -81,6 +85,12 @@ def run_research_graph(query, year_quarter_dict=None, mode="combined"):
     print("📋 GRAPH EXECUTION COMPLETED")
     print("#"*100 + "\n")
     
+    return extract_output(result), result.get("charts") or []
+
+def extract_output(result):
+    """
+    The final answer from the graph's end state.
+    """
     # Extract result
     if "output" in result:
         print("Using output field from result")
@@ -46,6 +46,33 @@ def upload_file_to_s3(file_content, filename, folder="default", is_temp=False):
     
     return s3_key
 
+def fetch_s3_urls(prefix):
+    """List the S3 keys under a prefix, in key order (the prefix's folder key comes first)."""
+    s3_client = get_s3_client()
+    bucket_name = os.getenv('AWS_S3_BUCKET_NAME')
+    keys = []
+    for page in s3_client.get_paginator('list_objects_v2').paginate(Bucket=bucket_name, Prefix=prefix):
+        keys.extend(obj['Key'] for obj in page.get('Contents', []))
+    return keys
+
+def upload_to_s3(s3_key, content):
+    """Upload content to an exact S3 key."""
+    s3_client = get_s3_client()
+    bucket_name = os.getenv('AWS_S3_BUCKET_NAME')
+    s3_client.put_object(Bucket=bucket_name, Key=s3_key, Body=content)
+    return s3_key
+
+def get_presigned_url(s3_key, expiry=3600):
+    """Generate a presigned GET URL for an S3 key."""
+    return generate_presigned_url(s3_key, expiry)
+
+def download_from_s3(s3_key):
+    """Download an S3 object and return its content as bytes."""
+    s3_client = get_s3_client()
+    bucket_name = os.getenv('AWS_S3_BUCKET_NAME')
+    response = s3_client.get_object(Bucket=bucket_name, Key=s3_key)
+    return response['Body'].read()
+
 def generate_presigned_url(s3_key, expiry=3600):
     """Generate a presigned URL for an S3 object."""
     s3_client = get_s3_client()
@@ -69,6 +96,29 @@ def generate_presigned_url(s3_key, expiry=3600):
     
     return url
 
+def presign_visualization_url(s3_key):
+    """Presigned GET URL (24-hour expiry) for a visualization; the object need not exist yet."""
+    s3_client = boto3.client('s3')
+    return s3_client.generate_presigned_url(
+        'get_object',
+        Params={
+            'Bucket': os.getenv('AWS_S3_BUCKET_NAME'),
+            'Key': s3_key,
+            'ResponseContentType': 'image/png'
+        },
+        ExpiresIn=86400  # 24 hours
+    )
+
+def put_visualization(image_data, s3_key):
+    """Upload PNG bytes to an exact S3 key."""
+    s3_client = boto3.client('s3')
+    s3_client.put_object(
+        Bucket=os.getenv('AWS_S3_BUCKET_NAME'),
+        Key=s3_key,
+        Body=image_data,
+        ContentType='image/png'
+    )
+
 def upload_visualization_to_s3(image_data, prefix, filename):
     """
     Upload visualization to S3 with organized folder structure.
@@ -83,26 +133,10 @@ def upload_visualization_to_s3(image_data, prefix, filename):
         s3_key = f"{prefix}/{filename}"
         
         # Upload to S3
-        s3_client = boto3.client('s3')
-        s3_client.put_object(
-            Bucket=os.getenv('AWS_S3_BUCKET_NAME'),
-            Key=s3_key,
-            Body=image_data,
-            ContentType='image/png'
-        )
+        put_visualization(image_data, s3_key)
         
         # Generate presigned URL with 24-hour expiry
-        presigned_url = s3_client.generate_presigned_url(
-            'get_object',
-            Params={
-                'Bucket': os.getenv('AWS_S3_BUCKET_NAME'),
-                'Key': s3_key,
-                'ResponseContentType': 'image/png'
-            },
-            ExpiresIn=86400  # 24 hours
-        )
-        
-        return presigned_url
+        return presign_visualization_url(s3_key)
         
     except Exception as e:
         print(f"Error uploading to S3: {e}")
@@ -14,4 +14,6 @@ class ResearchState(TypedDict):
     chat_history: List  # Conversation history
     intermediate_steps: List[AgentAction]  # Results from agent actions
     metadata_filters: Optional[Dict]  # Optional year/quarter filters
-    mode: str  # "pinecone", "web_search", "snowflake", or "combined"
\ No newline at end of file
+    mode: str  # "pinecone", "web_search", "snowflake", or "combined"
+    chart_format: str  # "png" (image URLs in the answer) or "vega_lite" (specs in charts)
+    charts: List[Dict]  # Client-rendered chart specs collected by the search nodes
\ No newline at end of file
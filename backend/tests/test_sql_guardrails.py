@@ -0,0 +1,93 @@
+import pytest
+
+from agents.sql_guardrails import (
+    QueryRejected, apply_row_limit, check_read_only, has_period_filter, prepare_query
+)
+
+CAP = 10001  # MAX_RESULT_ROWS + 1 with the default of 10000
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM NVIDIA_FIN_DATA WHERE Year = 2024",
+    "WITH q AS (SELECT * FROM NVIDIA_FIN_DATA) SELECT * FROM q",
+    "SELECT REPLACE(Ticker, 'N', 'X') FROM NVIDIA_FIN_DATA",
+    "SELECT GET(obj, 'a') FROM t",
+    "SELECT 'DROP TABLE x; DELETE' AS note FROM t",
+    'SELECT "UPDATE" FROM t',
+    "SELECT * FROM t -- DELETE FROM t",
+    "SELECT * FROM t /* INSERT INTO t */",
+    "SELECT * FROM t;",
+])
+def test_read_only_queries_pass(sql):
+    assert check_read_only(sql) == sql.strip().rstrip(";").strip()
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM t; DROP TABLE t",
+    "SELECT 1; SELECT 2",
+    "DELETE FROM t",
+    "INSERT INTO t SELECT * FROM u",
+    "WITH q AS (SELECT 1) DELETE FROM t",
+    "SELECT * FROM t WHERE x IN (SELECT 1) UNION SELECT * FROM u; TRUNCATE t",
+    "CALL cleanup()",
+    "",
+])
+def test_write_or_multiple_statements_rejected(sql):
+    with pytest.raises(QueryRejected):
+        check_read_only(sql)
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT * FROM t", f"SELECT * FROM t\nLIMIT {CAP}"),
+    ("SELECT * FROM t -- last line", f"SELECT * FROM t -- last line\nLIMIT {CAP}"),
+    ("SELECT * FROM t LIMIT 10", "SELECT * FROM t LIMIT 10"),
+    ("SELECT * FROM t LIMIT 50000", f"SELECT * FROM t LIMIT {CAP}"),
+    ("SELECT * FROM t ORDER BY Date DESC LIMIT 10 OFFSET 5", "SELECT * FROM t ORDER BY Date DESC LIMIT 10 OFFSET 5"),
+    ("SELECT * FROM t ORDER BY Date FETCH FIRST 10 ROWS ONLY", "SELECT * FROM t ORDER BY Date FETCH FIRST 10 ROWS ONLY"),
+    ("SELECT * FROM t LIMIT 50000 OFFSET 5", f"SELECT * FROM (\nSELECT * FROM t LIMIT 50000 OFFSET 5\n) LIMIT {CAP}"),
+    ("SELECT * FROM t OFFSET 5 ROWS FETCH NEXT 20000 ROWS ONLY",
+     f"SELECT * FROM (\nSELECT * FROM t OFFSET 5 ROWS FETCH NEXT 20000 ROWS ONLY\n) LIMIT {CAP}"),
+    ("SELECT * FROM t LIMIT NULL OFFSET 5", f"SELECT * FROM (\nSELECT * FROM t LIMIT NULL OFFSET 5\n) LIMIT {CAP}"),
+    ("SELECT * FROM t WHERE note = 'LIMIT 5'", f"SELECT * FROM t WHERE note = 'LIMIT 5'\nLIMIT {CAP}"),
+    ("SELECT * FROM t LIMIT 5 -- LIMIT 99999", "SELECT * FROM t LIMIT 5 -- LIMIT 99999"),
+    ("SELECT * FROM t LIMIT 50000 -- note", f"SELECT * FROM (\nSELECT * FROM t LIMIT 50000 -- note\n) LIMIT {CAP}"),
+])
+def test_row_limit(sql, expected):
+    assert apply_row_limit(sql) == expected
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM NVIDIA_FIN_DATA WHERE Year = 2024",
+    'SELECT * FROM NVIDIA_FIN_DATA WHERE "Year" = 2024',
+    "SELECT * FROM NVIDIA_FIN_DATA n WHERE n.Quarter IN (1, 2)",
+    "SELECT * FROM NVIDIA_FIN_DATA WHERE Ticker = 'NVDA' AND (Year = 2024 AND Quarter = 1)",
+    "SELECT * FROM NVIDIA_FIN_DATA WHERE YEAR(Date) = 2024",
+    "SELECT * FROM NVIDIA_FIN_DATA WHERE Date >= '2024-01-01'",
+    "SELECT * FROM (SELECT * FROM NVIDIA_FIN_DATA WHERE Year = 2024) WHERE Close > 1",
+    "SELECT * FROM NVIDIA_FIN_DATA QUALIFY Year = 2024",
+])
+def test_period_filter_found(sql):
+    assert has_period_filter(sql)
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM NVIDIA_FIN_DATA",
+    "SELECT * FROM NVIDIA_FIN_DATA WHERE Ticker = 'NVDA' ORDER BY Date",
+    "SELECT Year FROM (SELECT Year, Close FROM NVIDIA_FIN_DATA) WHERE Close > 5",
+    "SELECT * FROM NVIDIA_FIN_DATA WHERE Close > 1 GROUP BY Year",
+    "SELECT * FROM NVIDIA_FIN_DATA WHERE Ticker = 'Year'",
+    "SELECT * FROM NVIDIA_FIN_DATA WHERE Close > 1 -- AND Year = 2024",
+    "SELECT * FROM NVIDIA_FIN_DATA WHERE Close > 1 /* Year = 2024 */",
+    "SELECT * FROM NVIDIA_FIN_DATA WHERE Close > DATE '2024-01-01'",
+    "SELECT * FROM NVIDIA_FIN_DATA WHERE Close > (SELECT AVG(Close) FROM NVIDIA_FIN_DATA WHERE Year = 2024)",
+])
+def test_period_filter_missing(sql):
+    assert not has_period_filter(sql)
+
+
+def test_prepare_query_requires_filter():
+    with pytest.raises(QueryRejected):
+        prepare_query("SELECT * FROM NVIDIA_FIN_DATA WHERE Ticker = 'NVDA' ORDER BY Date", require_filter=True)
+    assert prepare_query("SELECT * FROM NVIDIA_FIN_DATA WHERE Year = 2024;", require_filter=True) == (
+        f"SELECT * FROM NVIDIA_FIN_DATA WHERE Year = 2024\nLIMIT {CAP}"
+    )
@@ -150,6 +150,15 @@ def display_sidebar():
             # Save selected quarters for the specific year
             quarters_dict[year] = quarters
 
+        # Chart rendering: server-side PNGs or Vega-Lite specs drawn in the browser
+        st.markdown("---")
+        st.checkbox(
+            "Interactive charts",
+            value=False,
+            key="interactive_charts",
+            help="Draw financial charts in the browser instead of loading rendered images"
+        )
+        
         # Show help information
         with st.expander("Need Help?", expanded=False):
             st.markdown("""
@@ -200,6 +209,14 @@ def display_visualization(segment, viz_index):
             st.markdown(f"<a href='{image_url}' target='_blank'>📥 Download Image</a>", unsafe_allow_html=True)
             st.markdown("</div></div>", unsafe_allow_html=True)
 
+def display_chart_spec(chart):
+    """Renders a Vega-Lite chart returned by the backend."""
+    try:
+        st.vega_lite_chart(chart["spec"], use_container_width=True)
+        st.caption(f"{chart['title']} - {', '.join(chart.get('columns', []))}")
+    except Exception as e:
+        st.error(f"Failed to render visualization: {str(e)}")
+
 def display_main_content(user_selection):
     """Displays the main content area with enhanced UI."""
     # Create a branded header
@@ -316,7 +333,8 @@ def display_main_content(user_selection):
             research_request = {
                 "query": prompt,
                 "year_quarter_dict": year_quarter_dict,
-                "mode": mode_mapping[action]
+                "mode": mode_mapping[action],
+                "chart_format": "vega_lite" if st.session_state.get("interactive_charts") else "png"
             }
             
             # Display a professional loading animation
@@ -364,6 +382,13 @@ def display_main_content(user_selection):
                             # If no images found, display the text as is
                             st.markdown(result)
                         
+                        # Charts sent as Vega-Lite specs (interactive charts)
+                        charts = data.get("charts", [])
+                        if charts:
+                            st.markdown("## Visualizations")
+                            for chart in charts:
+                                display_chart_spec(chart)
+                        
                         st.markdown("</div>", unsafe_allow_html=True)
                     else:
                         st.error(f"❌ Error: {response.status_code} - {response.text}")